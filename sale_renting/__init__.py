@@ -1,25 +1,130 @@
 # -*- coding: utf-8 -*-
 
+import logging
+
+from . import cli
+from . import controllers
 from . import models
 from . import wizard
 from . import report
 from odoo.tools.sql import column_exists
 
+_logger = logging.getLogger(__name__)
+
+# Number of rows filled per transaction when initializing the rental columns
+RENTAL_INIT_CHUNK_SIZE = 100000
+
+
+def _add_columns(cr, table, columns):
+    """Add the missing columns, with the given value for all the existing rows.
+
+    A constant default is only stored in the catalog by PostgreSQL, the existing rows
+    are not rewritten. The default is dropped right away: the ORM handles the defaults
+    of the new records.
+
+    :param str table: name of the table
+    :param list columns: list of (name, type, value) tuples, the column being NULL
+        for the existing rows if the value is None
+    """
+    for name, column_type, value in columns:
+        if column_exists(cr, table, name):
+            continue
+        if value is None:
+            cr.execute('ALTER TABLE "%s" ADD COLUMN "%s" %s' % (table, name, column_type))
+        else:
+            cr.execute('ALTER TABLE "%s" ADD COLUMN "%s" %s DEFAULT %%s' % (table, name, column_type), [value])
+            cr.execute('ALTER TABLE "%s" ALTER COLUMN "%s" DROP DEFAULT' % (table, name))
+        cr.commit()
+
+
+def _fill_column(cr, table, column, query, chunk_size=RENTAL_INIT_CHUNK_SIZE):
+    """Fill the NULL values of a column by chunks of rows, each one committed separately.
+
+    The filling resumes where it stopped when it is interrupted: only the rows still
+    having a NULL value are processed.
+
+    :param str table: name of the table
+    :param str column: name of the column to fill
+    :param str query: UPDATE query filling `column`, with a non NULL value, for the rows
+        whose ids are given by the `%(ids)s` parameter
+    :param int chunk_size: number of rows updated per transaction
+    """
+    cr.execute('SELECT COUNT(*) FROM "%s" WHERE "%s" IS NULL' % (table, column))
+    total = cr.fetchone()[0]
+    done = last_id = 0
+    while done < total:
+        cr.execute(
+            'SELECT id FROM "%s" WHERE id > %%s AND "%s" IS NULL ORDER BY id LIMIT %%s' % (table, column),
+            [last_id, chunk_size])
+        ids = tuple(row[0] for row in cr.fetchall())
+        if not ids:
+            break
+        cr.execute(query, {'ids': ids})
+        cr.commit()
+        done += len(ids)
+        last_id = ids[-1]
+        _logger.info("%s.%s: %s/%s rows filled", table, column, done, total)
+
+
+def _fill_partner_risk(cr, chunk_size=RENTAL_INIT_CHUNK_SIZE):
+    _fill_column(cr, 'sale_order', 'partner_risk', """
+        UPDATE sale_order so
+           SET partner_risk = COALESCE(partner.risk, 1.0)
+          FROM sale_order chunk
+     LEFT JOIN res_partner partner ON partner.id = chunk.partner_id
+         WHERE so.id = chunk.id
+           AND chunk.id IN %(ids)s
+    """, chunk_size=chunk_size)
+
+
+def _fill_deposit(cr, chunk_size=RENTAL_INIT_CHUNK_SIZE):
+    # No line is a rental yet: only the delay costs count in the deposit
+    _fill_column(cr, 'sale_order', 'deposit', """
+        UPDATE sale_order so
+           SET deposit = -COALESCE(delay.total, 0),
+               total_deposit = COALESCE(so.amount_total, 0) - COALESCE(delay.total, 0)
+          FROM sale_order chunk
+     LEFT JOIN LATERAL (
+                SELECT SUM(sol.price_total) AS total
+                  FROM sale_order_line sol
+                  JOIN product_product product ON product.id = sol.product_id
+                  JOIN product_template template ON template.id = product.product_tmpl_id
+                 WHERE sol.order_id = chunk.id
+                   AND template.default_code = 'RENTAL'
+               ) delay ON TRUE
+         WHERE so.id = chunk.id
+           AND chunk.id IN %(ids)s
+    """, chunk_size=chunk_size)
+
+
 def _pre_init_rental(cr):
     """ Allow installing sale_renting in databases with large sale.order / sale.order.line tables.
     The different rental fields are all NULL (falsy) for existing sale orders,
     the computation is way more efficient in SQL than in Python.
+
+    The columns whose value does not depend on the existing rows are added with a constant
+    value, the others are filled by chunks of rows. The hook can be run again after an
+    interruption, it only completes the missing columns and values.
     """
-    if not column_exists(cr, 'sale_order', 'rental_status'):
-        cr.execute("""
-            ALTER TABLE "sale_order"
-            ADD COLUMN "rental_status" VARCHAR,
-            ADD COLUMN "has_pickable_lines" bool,
-            ADD COLUMN "has_returnable_lines" bool,
-            ADD COLUMN "next_action_date" timestamp
-        """)
-        cr.execute("""
-            ALTER TABLE "sale_order_line"
-            ADD COLUMN "reservation_begin" timestamp,
-            ADD COLUMN "start_date" timestamp
-        """)
+    _add_columns(cr, 'res_partner', [('risk', 'float8', 1.0), ('rental_risk_refresh', 'bool', False)])
+    _add_columns(cr, 'sale_order', [
+        ('is_rental_order', 'bool', False),
+        ('rental_status', 'varchar', None),
+        ('has_pickable_lines', 'bool', False),
+        ('has_returnable_lines', 'bool', False),
+        ('next_action_date', 'timestamp', None),
+        ('partner_risk', 'float8', None),
+        ('deposit', 'numeric', None),
+        ('total_deposit', 'numeric', None),
+    ])
+    _add_columns(cr, 'sale_order_line', [
+        ('is_rental', 'bool', False),
+        ('deposit', 'numeric', 0.0),
+        ('qty_returned', 'float8', 0.0),
+        ('start_date', 'timestamp', None),
+        ('return_date', 'timestamp', None),
+        ('reservation_begin', 'timestamp', None),
+    ])
+
+    _fill_partner_risk(cr)
+    _fill_deposit(cr)
@@ -14,7 +14,7 @@
 
     'category': 'Sales/Sales',
     'sequence': 160,
-    'version': '1.0',
+    'version': '1.1',
 
     'depends': ['sale_temporal'],
 
@@ -26,8 +26,10 @@
 
         'views/product_template_views.xml',
         'views/sale_order_views.xml',
+        'views/rental_perf_stat_views.xml',
         'views/res_config_settings_views.xml',
         'views/res_partner_views.xml',
+        'views/rental_risk_event_views.xml',
 
         'report/rental_order_report_templates.xml',
         'report/rental_report_views.xml',
@@ -49,6 +51,9 @@
         'web.assets_backend': [
             'sale_renting/static/src/**/*',
         ],
+        'web.qunit_suite_tests': [
+            'sale_renting/static/tests/**/*',
+        ],
     },
     'license': 'OEEL-1',
 }
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import argparse
+import sys
+from pathlib import Path
+
+import odoo
+from odoo.cli import Command
+from odoo.tools import config
+
+# Indexes maintained by sale_renting for its queries
+RENTAL_INDEXES = (
+    'sale_order_line_rental_product_index',
+    'sale_order_line_rental_in_rent_index',
+    'sale_order_rental_next_action_index',
+    'product_piece_missing_index',
+    'product_template_pieces_missing_index',
+    'product_template_rental_players_index',
+    'product_template_rental_playtime_index',
+    'product_template_rental_age_level_index',
+)
+
+
+def get_rental_index_usage(cr):
+    """Return the usage statistics of the rental indexes, from pg_stat_user_indexes.
+
+    :return: list of dicts, with a None `scans` for the indexes missing in the database
+    """
+    cr.execute("""
+        SELECT indexrelname, relname, idx_scan, idx_tup_read, idx_tup_fetch,
+               pg_size_pretty(pg_relation_size(indexrelid))
+          FROM pg_stat_user_indexes
+         WHERE indexrelname IN %s
+    """, [RENTAL_INDEXES])
+    stats = {row[0]: row for row in cr.fetchall()}
+    return [{
+        'index': name,
+        'table': stats[name][1] if name in stats else None,
+        'scans': stats[name][2] if name in stats else None,
+        'tuples_read': stats[name][3] if name in stats else None,
+        'tuples_fetched': stats[name][4] if name in stats else None,
+        'size': stats[name][5] if name in stats else None,
+    } for name in RENTAL_INDEXES]
+
+
+class RentalIndexes(Command):
+    """Report the usage of the indexes of the Rental app"""
+    name = 'rental_indexes'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{Path(sys.argv[0]).name} {self.name}',
+            description=self.__doc__,
+        )
+        parser.add_argument('-c', '--config', dest='config', help="use a specific configuration file")
+        parser.add_argument('-d', '--database', dest='db_name', help="database to inspect")
+        args = parser.parse_args(cmdargs)
+        config.parse_config([f'--config={args.config}'] if args.config else [])
+        db_name = args.db_name or config['db_name']
+        if not db_name:
+            sys.exit("No database given, use --database")
+
+        with odoo.sql_db.db_connect(db_name).cursor() as cr:
+            usage = get_rental_index_usage(cr)
+
+        print("%-40s %-18s %10s %12s %12s %10s" % ('index', 'table', 'scans', 'tuples read', 'fetched', 'size'))
+        for stat in usage:
+            if stat['scans'] is None:
+                print("%-40s missing, update the sale_renting module" % stat['index'])
+                continue
+            print("%-40s %-18s %10s %12s %12s %10s" % (
+                stat['index'], stat['table'], stat['scans'], stat['tuples_read'], stat['tuples_fetched'], stat['size']))
+        unused = [stat['index'] for stat in usage if stat['scans'] == 0]
+        if unused:
+            print("\nNever scanned since the statistics were reset: %s" % ", ".join(unused))
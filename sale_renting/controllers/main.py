@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import http, _
+from odoo.exceptions import UserError
+from odoo.http import request
+
+
+class RentalController(http.Controller):
+
+    @http.route('/sale_renting/rental_quote', type='json', auth='user')
+    def rental_quote(self, product_id, pickup_date, return_date, quantity=1.0, pricelist_id=False,
+                     tax_ids=None, company_id=False, **kwargs):
+        """Price a rental without going through the rental configurator records.
+
+        See rental.wizard.get_rental_quote.
+        """
+        return request.env['rental.wizard'].get_rental_quote(
+            product_id, pickup_date, return_date, quantity=quantity, pricelist_id=pricelist_id,
+            tax_ids=tax_ids, company_id=company_id,
+        )
+
+    @http.route('/sale_renting/rental_pricing_table', type='json', auth='user')
+    def rental_pricing_table(self, product_id, pricelist_id=False, tax_ids=None, company_id=False, **kwargs):
+        """Pricing rules used by the rental configurator to price rentals client side.
+
+        See rental.wizard.get_rental_pricing_table.
+        """
+        return request.env['rental.wizard'].get_rental_pricing_table(
+            product_id, pricelist_id=pricelist_id, tax_ids=tax_ids, company_id=company_id,
+        )
+
+    @http.route('/sale_renting/catalog', type='json', auth='user')
+    def rental_catalog(self, players=None, playtime=None, age=None, level=None, limit=80, offset=0, **kwargs):
+        """Search the rental games by number of players, playtime, age and level.
+
+        See product.template.search_rental_catalog.
+        """
+        return request.env['product.template'].search_rental_catalog(
+            players=players, playtime=playtime, age=age, level=level, limit=limit, offset=offset,
+        )
+
+    @http.route('/sale_renting/register_defects', type='json', auth='user')
+    def register_defects(self, order_id, defects, **kwargs):
+        """Register the defects found when checking a return.
+
+        :param int order_id: rental order
+        :param list defects: dicts with the `order_line_id`, `product_piece_id` and `qty` keys
+        :return: the created defects and the new deposit of the order
+        :rtype: dict
+        """
+        if (
+            not isinstance(order_id, int) or isinstance(order_id, bool)
+            or not isinstance(defects, list) or not all(isinstance(defect, dict) for defect in defects)
+        ):
+            raise UserError(_("The defects must be given as a list, with the id of the order."))
+        order = request.env['sale.order'].browse(order_id).exists()
+        if not order:
+            raise UserError(_("The order %s does not exist.", order_id))
+        created_defects = order._register_defects([{
+            'order_line_id': defect.get('order_line_id'),
+            'product_piece_id': defect.get('product_piece_id'),
+            'qty': defect.get('qty', 0),
+        } for defect in defects])
+        return {
+            'defect_ids': created_defects.ids,
+            'deposit': order.deposit,
+            'total_deposit': order.total_deposit,
+        }
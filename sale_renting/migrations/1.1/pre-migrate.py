@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo.addons.sale_renting import _add_columns, _fill_partner_risk
+
+
+def migrate(cr, version):
+    """Fill the customer risk snapshot of the existing orders by chunks of rows, rather
+    than letting the ORM compute it for all the orders in a single transaction."""
+    _add_columns(cr, 'sale_order', [('partner_risk', 'float8', None)])
+    _fill_partner_risk(cr)
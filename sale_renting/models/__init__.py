@@ -2,6 +2,8 @@
 from . import product_piece
 from . import product_product
 from . import product_template
+from . import rental_perf_stat
+from . import rental_risk_event
 from . import res_company
 from . import res_config_settings
 from . import res_partner
@@ -1,18 +1,32 @@
 # -*- coding: utf-8 -*-
 
 from odoo import fields, models, api
+from odoo.tools.sql import create_index
 
 
 class ProductPiece(models.Model):
     _name = 'product.piece'
 
-    product_template_id = fields.Many2one('product.template')
+    product_template_id = fields.Many2one('product.template', index=True)
     name = fields.Char(string='Name')
     qty = fields.Integer(string='Quantity')
     group_value = fields.Float(string='Total percentage value')
-    individual_value = fields.Float(string='Piece value', compute="_compute_individual_value")
+    individual_value = fields.Float(string='Piece value', compute="_compute_individual_value", store=True)
+    defect_ids = fields.One2many('product.piece.defect', 'product_piece_id', string="Defects")
+    defect_count = fields.Integer("Defects Count", compute='_compute_defect_stats', store=True)
+    qty_lost = fields.Integer("Lost", compute='_compute_defect_stats', store=True,
+                              help="Quantity of this piece reported as defective over all the rentals.")
+    qty_missing = fields.Integer("Missing", compute='_compute_defect_stats', store=True,
+                                 help="Quantity of this piece reported as defective and not processed yet.")
 
-    @api.onchange('qty', 'group_value')
+    def _auto_init(self):
+        res = super()._auto_init()
+        # only a few pieces are missing at a time
+        create_index(self._cr, 'product_piece_missing_index', self._table,
+                     ['product_template_id', 'qty_missing'], where='qty_missing > 0')
+        return res
+
+    @api.depends('qty', 'group_value', 'product_template_id.list_price')
     def _compute_individual_value(self):
         for piece in self:
             if not piece.product_template_id.list_price or not piece.qty:
@@ -20,18 +34,37 @@ class ProductPiece(models.Model):
             else:
                 piece.individual_value = ((piece.group_value / 100) * piece.product_template_id.list_price) / piece.qty
 
+    @api.depends('defect_ids.qty', 'defect_ids.processed')
+    def _compute_defect_stats(self):
+        stats = {}
+        if self._origin.ids:
+            for group in self.env['product.piece.defect']._read_group(
+                [('product_piece_id', 'in', self._origin.ids)],
+                ['qty:sum'],
+                ['product_piece_id', 'processed'],
+                lazy=False,
+            ):
+                count, qty_lost, qty_missing = stats.get(group['product_piece_id'][0], (0, 0, 0))
+                stats[group['product_piece_id'][0]] = (
+                    count + group['__count'],
+                    qty_lost + group['qty'],
+                    qty_missing + (0 if group['processed'] else group['qty']),
+                )
+        for piece in self:
+            piece.defect_count, piece.qty_lost, piece.qty_missing = stats.get(piece._origin.id, (0, 0, 0))
+
 
 class ProductPieceSale(models.Model):
     _name = 'product.piece.defect'
 
     name = fields.Char(compute="_compute_name")
-    order_line_id = fields.Many2one('sale.order.line')
-    product_piece_id = fields.Many2one('product.piece', string="Piece")
+    order_line_id = fields.Many2one('sale.order.line', index=True)
+    product_piece_id = fields.Many2one('product.piece', string="Piece", index=True)
     qty = fields.Integer(string='Quantity')
     total = fields.Integer(string='Total', compute="_compute_total", store=True)
     processed = fields.Boolean()
 
-    @api.depends('qty', 'product_piece_id')
+    @api.depends('qty', 'product_piece_id.individual_value')
     def _compute_total(self):
         for piece in self:
             piece.total = piece.qty * piece.product_piece_id.individual_value
@@ -1,6 +1,6 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from odoo import fields, models, _
+from odoo import api, fields, models, _
 
 
 class ProductProduct(models.Model):
@@ -28,15 +28,43 @@ class ProductProduct(models.Model):
         Note: we don't use product.with_context(location=self.env.company.rental_loc_id.id).qty_available
         because there are no stock moves for services (which can be rented).
         """
-        active_rental_lines = self.env['sale.order.line']._read_group(
-            domain=self._get_qty_in_rent_domain(),
-            fields=['product_id', 'qty_delivered:sum', 'qty_returned:sum'],
-            groupby=['product_id'],
-        )
-        res = dict((data['product_id'][0], data['qty_delivered'] - data['qty_returned']) for data in active_rental_lines)
+        res = self._get_qty_in_rent_by_product()
         for product in self:
             product.qty_in_rent = res.get(product.id, 0)
 
+    def _get_qty_in_rent_by_product(self):
+        """Return the quantity currently in rent of the products, in a single query.
+
+        :return: dict {product_id: quantity in rent}, products not in rent are omitted
+        :rtype: dict
+        """
+        SaleOrderLine = self.env['sale.order.line']
+        domain = self._get_qty_in_rent_domain()
+        # the lines are read in database: flush the fields of the domain, of the record rules
+        # and of the quantities
+        SaleOrderLine._flush_search(domain, fields=['product_id', 'qty_delivered', 'qty_returned'])
+        query = SaleOrderLine._where_calc(domain)
+        SaleOrderLine._apply_ir_rules(query, 'read')
+        # only the lines in rent, matching the sale_order_line_rental_in_rent_index partial index
+        query.add_where('"sale_order_line"."qty_delivered" - "sale_order_line"."qty_returned" > 0')
+        from_clause, where_clause, where_params = query.get_sql()
+        self.env.cr.execute("""
+            SELECT "sale_order_line"."product_id",
+                   SUM("sale_order_line"."qty_delivered" - "sale_order_line"."qty_returned")
+              FROM %s
+             WHERE %s
+          GROUP BY "sale_order_line"."product_id"
+        """ % (from_clause, where_clause), where_params)
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_rental_products_domain(self):
+        """Domain of the rentable products visible in the allowed companies."""
+        return [
+            ('rent_ok', '=', True),
+            ('company_id', 'in', [False] + self.env.companies.ids),
+        ]
+
     def _compute_delay_price(self, duration):
         """Compute daily and hourly delay price.
 
@@ -1,6 +1,15 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 from odoo import api, fields, models, _
+from odoo.osv import expression
+from odoo.tools.sql import create_index
+
+from .rental_perf_stat import rental_perf
+
+# Fields returned by the rental catalog search
+RENTAL_CATALOG_FIELDS = [
+    'name', 'players_min', 'players_max', 'time_min', 'time_max', 'age', 'level', 'list_price', 'display_price',
+]
 
 
 class ProductTemplate(models.Model):
@@ -11,6 +20,9 @@ class ProductTemplate(models.Model):
         help="Allow renting of this product.")
     qty_in_rent = fields.Float("Quantity currently in rent", compute='_get_qty_in_rent')
     pieces = fields.One2many('product.piece', 'product_template_id', string="Pieces")
+    pieces_missing = fields.Integer(
+        "Missing Pieces", compute='_compute_pieces_missing', store=True,
+        help="Quantity of pieces reported as defective and not processed yet.")
     rent_product = fields.Many2one('product.template')
 
     # Delays pricing
@@ -35,6 +47,102 @@ class ProductTemplate(models.Model):
         string="Base Game",
         help="If this is an expansion, choose the base game here to raise a warning when renting alone. Otherwise, leave blank.")
 
+    def _auto_init(self):
+        res = super()._auto_init()
+        create_index(self._cr, 'product_template_pieces_missing_index', self._table,
+                     ['pieces_missing'], where='pieces_missing > 0')
+        # rental catalog search, see _get_rental_catalog_domain
+        create_index(self._cr, 'product_template_rental_players_index', self._table,
+                     ['players_min', 'players_max'], where='rent_ok')
+        create_index(self._cr, 'product_template_rental_playtime_index', self._table,
+                     ['time_min', 'time_max'], where='rent_ok')
+        create_index(self._cr, 'product_template_rental_age_level_index', self._table,
+                     ['age', 'level'], where='rent_ok')
+        return res
+
+    @api.depends('pieces.qty_missing')
+    def _compute_pieces_missing(self):
+        for product in self:
+            product.pieces_missing = sum(product.pieces.mapped('qty_missing'))
+
+    @api.model
+    def _get_rental_catalog_domain(self, players=None, playtime=None, age=None, level=None):
+        """Get the domain of the rental games matching the given criteria.
+
+        An unset (empty or 0) bound of a game is considered unbounded, e.g. a game without
+        maximum number of players matches any number of players above its minimum.
+
+        :param int players: number of players, within the range of players of the games
+        :param playtime: playtime in minutes, or (min, max) range of playtime overlapping
+            the range of playtime of the games
+        :param int age: age of the youngest player, at least the minimum age of the games
+        :param level: level, or list of levels, of the games
+        :return: domain on product.template
+        :rtype: list
+        """
+        def at_most(field_name, value):
+            return ['|', (field_name, '<=', value), (field_name, 'in', [0, False])]
+
+        def at_least(field_name, value):
+            return ['|', (field_name, '>=', value), (field_name, 'in', [0, False])]
+
+        domains = [[('rent_ok', '=', True)]]
+        if players:
+            domains += [at_most('players_min', players), at_least('players_max', players)]
+        if playtime:
+            time_min, time_max = playtime if isinstance(playtime, (list, tuple)) else (playtime, playtime)
+            if time_max:
+                domains.append(at_most('time_min', time_max))
+            if time_min:
+                domains.append(at_least('time_max', time_min))
+        if age:
+            domains.append(at_most('age', age))
+        if level:
+            domains.append([('level', 'in', level if isinstance(level, (list, tuple)) else [level])])
+        return expression.AND(domains)
+
+    @api.model
+    def search_rental_catalog(self, players=None, playtime=None, age=None, level=None, limit=80, offset=0):
+        """Search the rental games, see _get_rental_catalog_domain.
+
+        :return: the matching games, their metadata and the total number of matches
+        :rtype: dict
+        """
+        domain = self._get_rental_catalog_domain(players=players, playtime=playtime, age=age, level=level)
+        records = self.search_read(domain, RENTAL_CATALOG_FIELDS, offset=offset, limit=limit, order='name, id')
+        if limit and (offset or len(records) == limit):
+            count = self.search_count(domain)
+        else:
+            count = offset + len(records)
+        return {'records': records, 'count': count}
+
+    @api.model
+    def get_incomplete_products(self, limit=None):
+        """Get the rental products having missing pieces, the most incomplete first.
+
+        :param int limit: maximum number of products
+        :return: the products and their missing pieces
+        :rtype: list
+        """
+        products = self.search(
+            [('rent_ok', '=', True), ('pieces_missing', '>', 0)], order='pieces_missing desc, id', limit=limit)
+        missing_pieces = self.env['product.piece'].search_read(
+            [('product_template_id', 'in', products.ids), ('qty_missing', '>', 0)],
+            ['product_template_id', 'name', 'qty_missing'], order='qty_missing desc, id')
+        pieces_by_product = {product.id: [] for product in products}
+        for piece in missing_pieces:
+            pieces_by_product[piece['product_template_id'][0]].append({
+                'id': piece['id'],
+                'name': piece['name'],
+                'qty_missing': piece['qty_missing'],
+            })
+        return [{
+            'id': product.id,
+            'name': product.display_name,
+            'pieces_missing': product.pieces_missing,
+            'pieces': pieces_by_product[product.id],
+        } for product in products]
+
     @api.depends('extra_hourly_percent', 'extra_daily_percent')
     def _compute_delay(self):
         for product in self:
@@ -65,8 +173,9 @@ class ProductTemplate(models.Model):
         rentable = self.filtered('rent_ok')
         not_rentable = self - rentable
         not_rentable.update({'qty_in_rent': 0.0})
+        qty_in_rent = rentable.product_variant_ids._get_qty_in_rent_by_product()
         for template in rentable:
-            template.qty_in_rent = sum(template.mapped('product_variant_ids.qty_in_rent'))
+            template.qty_in_rent = sum(qty_in_rent.get(product_id, 0.0) for product_id in template.product_variant_ids.ids)
 
     def action_view_rentals(self):
         """Access Gantt view of rentals (sale.rental.schedule), filtered on variants of the current template."""
@@ -93,6 +202,13 @@ class ProductTemplate(models.Model):
             for res in res_names
         ]
 
+    @rental_perf('product.template._get_best_pricing_rule')
+    def _get_best_pricing_rule(
+        self, product=False, start_date=False, end_date=False, duration=False, unit='', **kwargs
+    ):
+        return super()._get_best_pricing_rule(
+            product=product, start_date=start_date, end_date=end_date, duration=duration, unit=unit, **kwargs)
+
     def _get_contextual_price(self, product=None):
         self.ensure_one()
         if not (product or self).rent_ok:
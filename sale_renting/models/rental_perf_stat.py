@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import functools
+import logging
+import time
+from collections import defaultdict, deque
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models, tools, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# Maximum number of samples kept in memory, per database, between two flushes
+PERF_BUFFER_SIZE = 10000
+# Minimum delay, in seconds, between two flushes of the samples of a process
+PERF_FLUSH_INTERVAL = 300
+# Number of days the statistics are kept
+PERF_STAT_RETENTION_DAYS = 30
+
+# {dbname: deque of (operation, duration, query count, record count)}, the oldest
+# samples being dropped when the buffer is full
+_perf_samples = defaultdict(lambda: deque(maxlen=PERF_BUFFER_SIZE))
+# {dbname: time.monotonic() of the last flush}
+_perf_last_flush = {}
+
+
+def rental_perf(operation, count=None):
+    """Decorate a method to record its duration, query count and record count.
+
+    The samples are kept in the memory of the process. Once PERF_FLUSH_INTERVAL seconds
+    passed since the last flush, the worker flushes them into `rental.perf.stat` on a
+    separate cursor after the commit of the current transaction. Nothing is recorded
+    unless the instrumentation is enabled in the settings.
+
+    :param str operation: name of the measured operation
+    :param count: function giving the number of processed records from the recordset
+        and the result of the method, the size of the recordset by default
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.env['rental.perf.stat']._is_enabled():
+                return method(self, *args, **kwargs)
+            cr = self.env.cr
+            queries = cr.sql_log_count
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            duration = time.perf_counter() - start
+            records = count(self, result) if count else len(self)
+            _perf_samples[cr.dbname].append((operation, duration, cr.sql_log_count - queries, records))
+            if (
+                time.monotonic() - _perf_last_flush.setdefault(cr.dbname, time.monotonic()) > PERF_FLUSH_INTERVAL
+                and not cr.postcommit.data.get('rental_perf_flush')
+            ):
+                cr.postcommit.data['rental_perf_flush'] = True
+                cr.postcommit.add(functools.partial(_flush_samples_postcommit, self.pool))
+            return result
+        return wrapper
+    return decorator
+
+
+def _flush_samples_postcommit(registry):
+    """Flush the samples of the process in their own transaction, once the transaction
+    that recorded them is committed."""
+    try:
+        with registry.cursor() as cr:
+            api.Environment(cr, SUPERUSER_ID, {})['rental.perf.stat']._flush_samples()
+    except Exception:
+        _logger.exception("Failed to flush the rental performance samples")
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of the given sorted values."""
+    return values[max(0, -(-len(values) * percent // 100) - 1)]
+
+
+class RentalPerfStat(models.Model):
+    """Timings of the rental hot paths, aggregated per operation and flush."""
+    _name = 'rental.perf.stat'
+    _description = 'Rental Performance Statistics'
+    _order = 'date desc, operation'
+
+    date = fields.Datetime(required=True, readonly=True, default=fields.Datetime.now, index=True)
+    operation = fields.Char(required=True, readonly=True, index=True)
+    call_count = fields.Integer("Calls", readonly=True)
+    record_count = fields.Integer("Records", readonly=True)
+    duration_avg = fields.Float("Average (ms)", readonly=True, digits=(16, 3), group_operator='avg')
+    duration_p50 = fields.Float("p50 (ms)", readonly=True, digits=(16, 3), group_operator='avg')
+    duration_p95 = fields.Float("p95 (ms)", readonly=True, digits=(16, 3), group_operator='avg')
+    duration_max = fields.Float("Max (ms)", readonly=True, digits=(16, 3), group_operator='max')
+    query_avg = fields.Float("Queries (avg)", readonly=True, digits=(16, 1), group_operator='avg')
+    query_max = fields.Integer("Queries (max)", readonly=True, group_operator='max')
+
+    @api.model
+    @tools.ormcache()
+    def _is_enabled(self):
+        """Whether the rental operations are instrumented, see res.config.settings.
+
+        The cache is cleared when the configuration parameters are written.
+        """
+        return bool(self.env['ir.config_parameter'].sudo().get_param('sale_renting.perf_instrumentation'))
+
+    @api.model
+    def _flush_samples(self):
+        """Aggregate the samples recorded in memory by this process, per operation.
+
+        :return: the created statistics
+        """
+        samples = _perf_samples[self.env.cr.dbname]
+        _perf_last_flush[self.env.cr.dbname] = time.monotonic()
+        if not samples:
+            return self.browse()
+        samples_by_operation = defaultdict(list)
+        while samples:
+            try:
+                operation, *sample = samples.popleft()
+            except IndexError:  # emptied by another thread
+                break
+            samples_by_operation[operation].append(sample)
+        vals_list = []
+        for operation, operation_samples in samples_by_operation.items():
+            durations = sorted(duration * 1000 for duration, __, __ in operation_samples)
+            query_counts = [query_count for __, query_count, __ in operation_samples]
+            vals_list.append({
+                'operation': operation,
+                'call_count': len(operation_samples),
+                'record_count': sum(record_count for __, __, record_count in operation_samples),
+                'duration_avg': sum(durations) / len(durations),
+                'duration_p50': _percentile(durations, 50),
+                'duration_p95': _percentile(durations, 95),
+                'duration_max': durations[-1],
+                'query_avg': sum(query_counts) / len(query_counts),
+                'query_max': max(query_counts),
+            })
+        return self.sudo().create(vals_list)
+
+    @api.autovacuum
+    def _gc_perf_stats(self):
+        limit_date = fields.Datetime.now() - relativedelta(days=PERF_STAT_RETENTION_DAYS)
+        self.sudo().search([('date', '<', limit_date)]).unlink()
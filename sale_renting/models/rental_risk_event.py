@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from collections import defaultdict
+
+from odoo import api, fields, models
+
+
+class RentalRiskEvent(models.Model):
+    """Customer behaviour recorded during rentals.
+
+    The events are only appended: the risk of the customers is recomputed from the
+    unprocessed events in batch, by `_process_risk_events`.
+    """
+    _name = 'rental.risk.event'
+    _description = 'Rental Risk Event'
+    _order = 'id desc'
+
+    partner_id = fields.Many2one('res.partner', string="Customer", required=True, index=True, ondelete='cascade')
+    order_id = fields.Many2one('sale.order', string="Order", ondelete='set null')
+    company_id = fields.Many2one('res.company', required=True, default=lambda self: self.env.company)
+    event_type = fields.Selection([
+        ('pickup', "Pickup"),
+        ('return', "Return"),
+        ('defect', "Return with defects"),
+        ('late', "Late return"),
+    ], string="Event", required=True)
+    processed = fields.Boolean(default=False, readonly=True, index=True)
+
+    @api.model
+    def _record_order_events(self, orders, event_type):
+        """Record an event for the customer of each order and schedule the risk update.
+
+        :param sale.order orders: orders the event happened on
+        :param str event_type: type of event, or a function giving it for an order
+        :return: the recorded events
+        """
+        events = self.sudo().create([{
+            'partner_id': order.partner_id.id,
+            'order_id': order.id,
+            'company_id': order.company_id.id,
+            'event_type': event_type(order) if callable(event_type) else event_type,
+        } for order in orders])
+        self.env.ref('sale_renting.ir_cron_rental_risk_events')._trigger()
+        return events
+
+    def _compute_risk(self, risk):
+        """Apply the events, in order, to the given risk.
+
+        The weights of the events are configured on the company of the events.
+
+        :param float risk: risk of the customer before the events
+        :return: risk of the customer after the events
+        :rtype: float
+        """
+        for event in self:
+            company = event.company_id
+            if event.event_type in ('defect', 'late'):
+                risk = min(risk + company[f'rental_risk_{event.event_type}'], company.rental_risk_max)
+            elif event.event_type == 'return' and company.rental_risk_return_factor:
+                risk = max(risk / company.rental_risk_return_factor, company.rental_risk_min)
+        return risk
+
+    @api.model
+    def _process_risk_events(self, limit=None):
+        """Update the risk of the customers having unprocessed events.
+
+        :param int limit: maximum number of events to process, the job being triggered
+            again if there are more
+        :return: the processed events
+        """
+        events = self.sudo().search([('processed', '=', False)], order='id', limit=limit)
+        event_ids_by_partner = defaultdict(list)
+        for event in events:
+            event_ids_by_partner[event.partner_id].append(event.id)
+        partner_ids_by_risk = defaultdict(list)
+        for partner, event_ids in event_ids_by_partner.items():
+            risk = events.browse(event_ids)._compute_risk(partner.risk)
+            if risk != partner.risk:
+                partner_ids_by_risk[risk].append(partner.id)
+        for risk, partner_ids in partner_ids_by_risk.items():
+            self.env['res.partner'].sudo().browse(partner_ids).risk = risk
+        events.processed = True
+        if limit and len(events) == limit:
+            self.env.ref('sale_renting.ir_cron_rental_risk_events')._trigger()
+        return events
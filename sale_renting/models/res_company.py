@@ -20,6 +20,20 @@ class ResCompany(models.Model):
         help="The product is used to add the cost to the sales order",
         domain="[('type', '=', 'service')]")
 
+    # Customer Risk
+
+    rental_risk_defect = fields.Float(
+        "Risk Increase on Defects", default=0.25,
+        help="Increase of the customer risk when products are returned with defects.")
+    rental_risk_late = fields.Float(
+        "Risk Increase on Late Returns", default=0.25,
+        help="Increase of the customer risk when products are returned late.")
+    rental_risk_return_factor = fields.Float(
+        "Risk Decrease on Returns", default=1.25,
+        help="The customer risk is divided by this factor when products are returned on time and without defects.")
+    rental_risk_min = fields.Float("Minimum Risk", default=0.1)
+    rental_risk_max = fields.Float("Maximum Risk", default=2.0)
+
     _sql_constraints = [
         ('min_extra_hour',
             "CHECK(min_extra_hour >= 1)",
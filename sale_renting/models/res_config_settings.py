@@ -25,6 +25,16 @@ class ResConfigSettings(models.TransientModel):
         help="This product will be used to add fines in the Rental Order.", related="company_id.extra_product",
         readonly=False, domain="[('type', '=', 'service')]")
 
+    rental_risk_defect = fields.Float(related="company_id.rental_risk_defect", readonly=False)
+    rental_risk_late = fields.Float(related="company_id.rental_risk_late", readonly=False)
+    rental_risk_return_factor = fields.Float(related="company_id.rental_risk_return_factor", readonly=False)
+    rental_risk_min = fields.Float(related="company_id.rental_risk_min", readonly=False)
+    rental_risk_max = fields.Float(related="company_id.rental_risk_max", readonly=False)
+
+    rental_perf_instrumentation = fields.Boolean(
+        "Performance Statistics", config_parameter='sale_renting.perf_instrumentation',
+        help="Record the duration and queries of the rental operations, see Configuration > Performance Statistics.")
+
     module_sale_renting_sign = fields.Boolean(string="Digital Documents")
 
     @api.onchange('extra_hour')
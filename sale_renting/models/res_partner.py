@@ -8,3 +8,16 @@ class ResPartner(models.Model):
     _inherit = "res.partner"
 
     risk = fields.Float("Risk", default=1.0)
+    rental_risk_event_ids = fields.One2many('rental.risk.event', 'partner_id', string="Risk Events")
+    rental_risk_refresh = fields.Boolean(
+        "Risk to Apply", copy=False, readonly=True, index=True,
+        help="The risk changed and the quotations of the customer are not updated yet.")
+
+    def write(self, vals):
+        if 'risk' in vals:
+            # the quotations are updated in batch, see sale.order._refresh_queued_partner_risk
+            vals = dict(vals, rental_risk_refresh=True)
+        res = super().write(vals)
+        if 'risk' in vals:
+            self.env.ref('sale_renting.ir_cron_rental_partner_risk')._trigger()
+        return res
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from odoo import api, fields, models, _
+import logging
+from collections import defaultdict
+
+from odoo import api, fields, models, Command, _
 from odoo.tools import float_compare
+from odoo.tools.sql import create_index
 from odoo.exceptions import UserError
 
+from .rental_perf_stat import rental_perf
+
+_logger = logging.getLogger(__name__)
+
+RENTAL_IMPORT_BATCH_SIZE = 500
+
 
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
@@ -12,6 +22,9 @@ class SaleOrder(models.Model):
     is_rental_order = fields.Boolean("Created In App Rental")
     deposit = fields.Monetary(string='Deposit', store=True, compute='_compute_deposit')
     total_deposit = fields.Monetary(string='Grand Total', store=True, compute='_compute_deposit')
+    partner_risk = fields.Float(
+        "Customer Risk", compute='_compute_partner_risk', store=True,
+        help="Risk of the customer used to compute the deposits, frozen at the confirmation of the order.")
     rental_status = fields.Selection([
         ('draft', 'Quotation'),
         ('sent', 'Quotation Sent'),
@@ -29,6 +42,13 @@ class SaleOrder(models.Model):
 
     has_late_lines = fields.Boolean(compute="_compute_has_late_lines")
 
+    def _auto_init(self):
+        res = super()._auto_init()
+        # pickups and returns to do, see the "To Do Today" menus and the late filter
+        create_index(self._cr, 'sale_order_rental_next_action_index', self._table,
+                     ['next_action_date', 'rental_status'], where="rental_status IN ('pickup', 'return')")
+        return res
+
     def action_confirm_wizard(self):
         for sale in self:
             missing = []
@@ -64,10 +84,52 @@ class SaleOrder(models.Model):
                 return sale.action_confirm()
 
     def action_confirm(self):
+        for order in self:
+            if order.partner_risk != order.partner_id.risk:
+                order.partner_risk = order.partner_id.risk
         super().action_confirm()
         return self.open_pickup
 
-    @api.depends('order_line', 'order_line.defects', 'amount_total')
+    @api.depends('partner_id')
+    def _compute_partner_risk(self):
+        # The risk of the customer changes on every return: it is not a dependency, the open
+        # quotations being updated in batch by `_refresh_queued_partner_risk`.
+        for order in self:
+            order.partner_risk = order.partner_id.risk
+
+    @api.model
+    def _refresh_partner_risk(self, partners):
+        """Update the customer risk, and thus the deposits, of the quotations of the given partners.
+
+        The confirmed orders keep the risk of the customer at their confirmation.
+
+        :param res.partner partners: partners whose risk changed
+        """
+        quotations = self.sudo().search([('partner_id', 'in', partners.ids), ('state', 'in', ('draft', 'sent'))])
+        quotation_ids_by_risk = defaultdict(list)
+        for quotation in quotations:
+            if quotation.partner_risk != quotation.partner_id.risk:
+                quotation_ids_by_risk[quotation.partner_id.risk].append(quotation.id)
+        for risk, quotation_ids in quotation_ids_by_risk.items():
+            quotations.browse(quotation_ids).partner_risk = risk
+
+    @api.model
+    def _refresh_queued_partner_risk(self, limit=None):
+        """Update the quotations of the partners whose risk changed, see res.partner.write.
+
+        :param int limit: maximum number of partners to process, the job being triggered
+            again if there are more
+        :return: the processed partners
+        """
+        partners = self.env['res.partner'].sudo().with_context(active_test=False).search(
+            [('rental_risk_refresh', '=', True)], order='id', limit=limit)
+        self._refresh_partner_risk(partners)
+        partners.rental_risk_refresh = False
+        if limit and len(partners) == limit:
+            self.env.ref('sale_renting.ir_cron_rental_partner_risk')._trigger()
+        return partners
+
+    @api.depends('order_line', 'order_line.deposit', 'order_line.price_total', 'order_line.defects.total', 'amount_total')
     def _compute_deposit(self):
         for order in self:
             deposit = 0
@@ -91,6 +153,7 @@ class SaleOrder(models.Model):
                 and order.next_action_date and order.next_action_date < fields.Datetime.now())
 
     @api.depends('state', 'order_line', 'order_line.product_uom_qty', 'order_line.qty_delivered', 'order_line.qty_returned')
+    @rental_perf('sale.order._compute_rental_status')
     def _compute_rental_status(self):
         for order in self:
             if order.state in ['sale', 'done'] and order.is_rental_order:
@@ -116,6 +179,50 @@ class SaleOrder(models.Model):
                 order.rental_status = order.state if order.is_rental_order else False
                 order.next_action_date = False
 
+    # IMPORT
+
+    @api.model
+    def import_rental_orders(self, orders_vals, batch_size=RENTAL_IMPORT_BATCH_SIZE):
+        """Create rental orders in bulk, e.g. to load historical rentals.
+
+        The orders are created by batches, without tracking, and the batch is flushed
+        at once: the computed fields of the orders and their lines (prices, deposits,
+        descriptions, rental status, ...) are computed once per batch.
+
+        :param list orders_vals: sale.order values, the rental lines being given as a
+            list of sale.order.line values in the `order_line` key.
+        :param int batch_size: number of orders created at once
+        :return: the created orders
+        :rtype: sale.order
+        """
+        SaleOrder = self.with_context(tracking_disable=True, mail_create_nolog=True, mail_notrack=True)
+        order_ids = []
+        for index in range(0, len(orders_vals), batch_size):
+            vals_list = [
+                self._prepare_rental_import_vals(vals) for vals in orders_vals[index:index + batch_size]
+            ]
+            order_ids += SaleOrder.create(vals_list).ids
+            self.env.flush_all()
+            # The imported records are not needed anymore, keep the cache small
+            self.env.invalidate_all()
+            _logger.info("Rental import: %s/%s orders created", len(order_ids), len(orders_vals))
+        return self.browse(order_ids)
+
+    @api.model
+    def _prepare_rental_import_vals(self, vals):
+        """Prepare the creation values of an imported rental order.
+
+        :param dict vals: order values, with its lines values in `order_line`
+        :rtype: dict
+        """
+        return {
+            'is_rental_order': True,
+            **vals,
+            'order_line': [
+                Command.create({'is_rental': True, **line_vals}) for line_vals in vals.get('order_line', [])
+            ],
+        }
+
     # PICKUP / RETURN : rental.processing wizard
 
     def open_pickup(self):
@@ -147,6 +254,10 @@ class SaleOrder(models.Model):
             'context': context
         }
 
+    def shift_rental_period(self, delta=None, start_date=False, return_date=False):
+        """Reschedule all the rental lines of the orders, see sale.order.line.shift_rental_period."""
+        self.order_line.shift_rental_period(delta=delta, start_date=start_date, return_date=return_date)
+
     def open_defect(self):
         context = {
             'default_order_id': self.id,
@@ -160,6 +271,40 @@ class SaleOrder(models.Model):
             'context': context
         }
 
+    def _register_defects(self, defects_vals):
+        """Register defects on the lines of the order at once.
+
+        The defects are created in a single batch, the deposit of the order being
+        recomputed once.
+
+        :param list defects_vals: product.piece.defect values, with the `order_line_id`,
+            `product_piece_id` and `qty` keys
+        :return: the created defects
+        :rtype: product.piece.defect
+        """
+        self.ensure_one()
+        for vals in defects_vals:
+            if not isinstance(vals, dict) or not all(
+                isinstance(vals.get(key), int) and not isinstance(vals.get(key), bool)
+                for key in ('order_line_id', 'product_piece_id')
+            ):
+                raise UserError(_("Each defect must give the ids of its order line and of its piece."))
+            qty = vals.get('qty', 0)
+            if not isinstance(qty, (int, float)) or isinstance(qty, bool) or qty <= 0:
+                raise UserError(_("The quantity of defective pieces must be positive."))
+        order_lines = {line.id: line for line in self.order_line}
+        pieces = self.env['product.piece'].browse([vals['product_piece_id'] for vals in defects_vals])
+        existing_pieces = pieces.exists()
+        for vals, piece in zip(defects_vals, pieces):
+            order_line = order_lines.get(vals['order_line_id'])
+            if not order_line:
+                raise UserError(_("The defects must be registered on the lines of the order %s.", self.name))
+            if piece not in existing_pieces:
+                raise UserError(_("The piece %s does not exist.", piece.id))
+            if piece.product_template_id != order_line.product_template_id:
+                raise UserError(_("The piece %s is not a piece of %s.", piece.name, order_line.product_template_id.name))
+        return self.env['product.piece.defect'].create(defects_vals)
+
     def _get_portal_return_action(self):
         """ Return the action used to display orders when returning from customer portal. """
         if self.is_rental_order:
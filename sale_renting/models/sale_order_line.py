@@ -1,11 +1,19 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from collections import defaultdict
 from datetime import timedelta, date
-from pytz import timezone, UTC
+
+import babel.dates
+from pytz import timezone, UTC, UnknownTimeZoneError
 
 from odoo import api, fields, models, _
-from odoo.tools import format_datetime, format_time
+from odoo.exceptions import UserError
+from odoo.tools import format_datetime
+from odoo.tools.sql import create_index
+from odoo.tools.misc import babel_locale_parse, get_lang, posix_to_ldml
+
+from .rental_perf_stat import rental_perf
 
 
 class SaleOrderLine(models.Model):
@@ -29,35 +37,52 @@ class SaleOrderLine(models.Model):
     temporal_type = fields.Selection(selection_add=[('rental', 'Rental')])
 
 
+    def _auto_init(self):
+        res = super()._auto_init()
+        # rented quantities, see product.product._get_qty_in_rent_domain
+        create_index(self._cr, 'sale_order_line_rental_product_index', self._table,
+                     ['product_id', 'state'], where="is_rental AND state IN ('sale', 'done')")
+        # lines currently in rent, a small part of the rental lines
+        create_index(self._cr, 'sale_order_line_rental_in_rent_index', self._table,
+                     ['product_id'], where="is_rental AND qty_delivered - qty_returned > 0")
+        return res
+
     @api.onchange('product_template_id')
     def _set_disctount(self):
+        sale_lines = self.filtered(lambda line: line.product_template_id.sale_ok and line.product_template_id.rent_product)
+        # Search the previous rentals of all the lines at once
+        rents = self.env['sale.order.line'].with_context(active_test=False).search([
+            ('order_id.partner_id', 'in', sale_lines.order_id.partner_id.ids),
+            ('order_id.state', '=', 'sale'),
+            ('product_template_id', 'in', sale_lines.product_template_id.rent_product.ids),
+        ]) if sale_lines else self.env['sale.order.line']
+        rents_by_key = defaultdict(lambda: self.env['sale.order.line'])
+        for rent in rents:
+            rents_by_key[rent.order_id.partner_id.id, rent.product_template_id.id] |= rent
+
         for line in self:
             discount = 0
-            if line.product_template_id:
-                if line.product_template_id.sale_ok:
-                    # Search for discount
-                    rents = self.env['sale.order.line'].with_context(active_test=False).search([
-                        ('order_id.partner_id', '=', line.order_id.partner_id.id),
-                        ('order_id.state', '=', 'sale'),
-                        ('product_template_id', '=', line.product_template_id.rent_product.id)
-                    ])
-                    if rents:
-                        if len(rents) > 1:
+            if line in sale_lines:
+                rents = rents_by_key[line.order_id.partner_id.id, line.product_template_id.rent_product.id]
+                if rents:
+                    if len(rents) > 1:
+                        discount = 10
+                    else:
+                        time = (rents.return_date - rents.start_date).days
+                        if time >= 7:
                             discount = 10
                         else:
-                            time = (rents.return_date - rents.start_date).days
-                            if time >= 7:
-                                discount = 10
-                            else:
-                                discount = 5
+                            discount = 5
 
             line.discount = discount
 
-    @api.depends('product_template_id', 'is_rental', 'product_uom_qty', 'order_id.partner_id')
+    @api.depends(
+        'product_template_id', 'product_template_id.list_price', 'is_rental', 'product_uom_qty',
+        'order_id.partner_risk')
     def _compute_deposit(self):
         for line in self:
             if line.is_rental:
-                line.deposit = (line.product_template_id.list_price / 2) * line.product_uom_qty * line.order_id.partner_id.risk
+                line.deposit = (line.product_template_id.list_price / 2) * line.product_uom_qty * line.order_id.partner_risk
             else:
                 line.deposit = 0
 
@@ -105,9 +130,11 @@ class SaleOrderLine(models.Model):
     def _compute_name(self):
         """Override to add the compute dependency.
 
-        The custom name logic can be found below in _get_sale_order_line_multiline_description_sale.
+        The custom name logic can be found below in _get_sale_order_line_multiline_description_sale,
+        the rental periods of all the lines being formatted beforehand in a single pass.
         """
-        super()._compute_name()
+        descriptions = self.filtered('is_rental')._get_rental_order_line_descriptions()
+        super(SaleOrderLine, self.with_context(rental_line_descriptions=descriptions))._compute_name()
 
     @api.onchange('is_rental')
     def _onchange_is_rental(self):
@@ -127,25 +154,66 @@ class SaleOrderLine(models.Model):
         """Add Rental information to the SaleOrderLine name."""
         res = super()._get_sale_order_line_multiline_description_sale()
         if self.is_rental:
-            res += self._get_rental_order_line_description()
+            descriptions = self.env.context.get('rental_line_descriptions') or {}
+            res += descriptions.get(self.id) or self._get_rental_order_line_description()
         return res
 
     def _get_rental_order_line_description(self):
+        self.ensure_one()
+        return self._format_rental_periods(self._get_tz())[self.id]
+
+    def _get_rental_order_line_descriptions(self):
+        """Get the rental period descriptions of the lines, in the language of their customer.
+
+        The lines are grouped by language (see sale.order.line._compute_name) so that
+        the timezone and the babel formats are only resolved once per group.
+
+        :return: the description of each line, by line id
+        :rtype: dict
+        """
+        line_ids_by_lang = defaultdict(list)
+        for line in self:
+            partner = line.order_partner_id
+            line_ids_by_lang[self.env.lang if partner.is_public else partner.lang].append(line.id)
         tz = self._get_tz()
-        if self.start_date and self.return_date\
-           and self.start_date.replace(tzinfo=UTC).astimezone(timezone(tz)).date()\
-               == self.return_date.replace(tzinfo=UTC).astimezone(timezone(tz)).date():
-            # If return day is the same as pickup day, don't display return_date Y/M/D in description.
-            return_date_part = format_time(self.with_context(use_babel=True).env, self.return_date, tz=tz, time_format=False)
-        else:
-            return_date_part = format_datetime(self.with_context(use_babel=True).env, self.return_date, tz=tz, dt_format=False)
+        descriptions = {}
+        for lang, line_ids in line_ids_by_lang.items():
+            descriptions.update(self.browse(line_ids).with_context(lang=lang)._format_rental_periods(tz))
+        return descriptions
 
-        return "\n%s %s %s" % (
-            format_datetime(self.with_context(use_babel=True).env, self.start_date, tz=tz, dt_format=False),
-            _("to"),
-            return_date_part,
-        )
+    def _format_rental_periods(self, tz):
+        """Format the rental period of the lines in the language of the environment.
 
+        :param str tz: name of the timezone the dates are displayed in
+        :return: the description of each line, by line id
+        :rtype: dict
+        """
+        try:
+            tzinfo = timezone(tz)
+        except UnknownTimeZoneError:
+            tzinfo = UTC
+        lang = get_lang(self.env)
+        locale = babel_locale_parse(lang.code)
+        time_format = posix_to_ldml(lang.time_format, locale=locale)
+        datetime_format = "%s %s" % (posix_to_ldml(lang.date_format, locale=locale), time_format)
+        to_label = _("to")
+
+        def format_date(value):
+            return value and babel.dates.format_datetime(value, datetime_format, locale=locale) or ''
+
+        descriptions = {}
+        for line in self:
+            start_date = line.start_date and UTC.localize(line.start_date).astimezone(tzinfo)
+            return_date = line.return_date and UTC.localize(line.return_date).astimezone(tzinfo)
+            if start_date and return_date and start_date.date() == return_date.date():
+                # If return day is the same as pickup day, don't display return_date Y/M/D in description.
+                return_date_part = babel.dates.format_time(return_date.timetz(), format=time_format, locale=locale)
+            else:
+                return_date_part = format_date(return_date)
+            descriptions[line.id] = "\n%s %s %s" % (format_date(start_date), to_label, return_date_part)
+        return descriptions
+
+    @rental_perf('sale.order.line._generate_delay_line')
     def _generate_delay_line(self, qty):
         """Generate a sale order line representing the delay cost due to the late return.
 
@@ -226,6 +294,213 @@ class SaleOrderLine(models.Model):
             format_datetime(self.with_context(use_babel=True).env, fields.Datetime.now(), tz=tz, dt_format=False)
         )
 
+    def shift_rental_period(self, delta=None, start_date=False, return_date=False):
+        """Reschedule the rental lines at once.
+
+        The rental period of the lines is either shifted by the given delta, in a single
+        query, or replaced by the given window. The lines are then repriced in batch, the
+        fields depending on the rental period (reservation, description, order status, ...)
+        being recomputed once for all the lines.
+
+        :param timedelta delta: shift applied to the pickup and return dates
+        :param datetime start_date: new pickup date
+        :param datetime return_date: new return date
+        """
+        if delta is None and not (start_date and return_date):
+            raise UserError(_("Please give either a delay or a new pickup and return date to reschedule the rentals."))
+        lines = self.filtered(lambda line: line.is_rental and line.start_date and line.return_date)
+        if not lines:
+            return
+        # the dates are shifted in SQL, bypassing the access checks of write
+        lines.check_access_rights('write')
+        lines.check_access_rule('write')
+        if delta is not None:
+            lines.flush_recordset(['start_date', 'return_date'])
+            self.env.cr.execute("""
+                UPDATE sale_order_line
+                   SET start_date = start_date + %s,
+                       return_date = return_date + %s,
+                       write_uid = %s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                 WHERE id IN %s
+            """, [delta, delta, self.env.uid, tuple(lines.ids)])
+            lines.invalidate_recordset(['start_date', 'return_date', 'write_uid', 'write_date'])
+            lines.modified(['start_date', 'return_date'])
+        else:
+            lines.write({
+                'start_date': fields.Datetime.to_datetime(start_date),
+                'return_date': fields.Datetime.to_datetime(return_date),
+            })
+        lines._reprice_rental_lines()
+
+    @rental_perf('sale.order.line._get_best_rental_pricings')
+    def _get_best_rental_pricings(self):
+        """Resolve the best pricing rule of the rental lines in a single query.
+
+        The query follows `product.pricing._compute_duration_vals`, `_get_suitable_pricings`
+        and `_get_best_pricing_rule`, the months being counted like `relativedelta`. Only the
+        lines priced by the pricing rules alone are resolved: not invoiced, without fiscal
+        position, in the unit of measure of the product and whose applicable pricings are all
+        in the currency of the order.
+
+        :return: the best pricing id (False if the list price applies) and the unit price,
+            by line id
+        :rtype: dict
+        """
+        if not self:
+            return {}
+        self.env.flush_all()
+        Pricing = self.env['product.pricing']
+        variants_field = Pricing._fields['product_variant_ids']
+        # among the pricings of the same price, the first one of `product_pricing_ids` wins
+        pricing_order = ', '.join('candidate.%s' % order.strip() for order in Pricing._order.split(','))
+        self.env.cr.execute(f"""
+            WITH line AS (
+                SELECT line.id,
+                       line.product_id,
+                       product.product_tmpl_id,
+                       sale_order.pricelist_id,
+                       sale_order.currency_id,
+                       currency.rounding,
+                       template.list_price,
+                       line.start_date,
+                       line.return_date,
+                       EXTRACT(EPOCH FROM line.return_date - line.start_date) / 3600 AS hour,
+                       (EXTRACT(YEAR FROM line.return_date) - EXTRACT(YEAR FROM line.start_date)) * 12
+                       + EXTRACT(MONTH FROM line.return_date) - EXTRACT(MONTH FROM line.start_date)
+                           AS calendar_months
+                  FROM sale_order_line line
+                  JOIN sale_order ON sale_order.id = line.order_id
+                  JOIN res_currency currency ON currency.id = sale_order.currency_id
+                  JOIN product_product product ON product.id = line.product_id
+                  JOIN product_template template ON template.id = product.product_tmpl_id
+                 WHERE line.id IN %s
+                   AND line.is_rental
+                   AND line.start_date IS NOT NULL
+                   AND line.return_date IS NOT NULL
+                   AND COALESCE(line.qty_invoiced, 0) <= 0
+                   -- the prices of the other units of measure are converted by the ORM
+                   AND line.product_uom = template.uom_id
+                   AND sale_order.pricelist_id IS NOT NULL
+                   AND sale_order.fiscal_position_id IS NULL
+                   AND template.is_temporal
+            ), whole_months AS (
+                -- like relativedelta, adding months to the start date clamps it to the end of
+                -- the month (03-31 + 1 month = 04-30): one month less if it overshoots
+                SELECT line.*,
+                       line.calendar_months - CASE
+                           WHEN line.start_date + line.calendar_months * INTERVAL '1 month' > line.return_date
+                           THEN 1 ELSE 0
+                       END AS months
+                  FROM line
+            ), duration AS (
+                SELECT line.*,
+                       CEIL(line.hour / 24) AS day,
+                       CEIL(CEIL(line.hour / 24) / 7) AS week,
+                       -- a started month counts from the first minute, as in _compute_duration_vals
+                       line.months + CASE
+                           WHEN line.return_date - (line.start_date + line.months * INTERVAL '1 month')
+                                >= INTERVAL '1 minute'
+                           THEN 1 ELSE 0
+                       END AS month
+                  FROM whole_months line
+            ), candidate AS (
+                SELECT duration.id AS line_id,
+                       pricing.id AS pricing_id,
+                       pricing.product_template_id,
+                       pricing.recurrence_id,
+                       pricing.pricelist_id,
+                       pricing.currency_id,
+                       pricing.price,
+                       recurrence.unit,
+                       recurrence.duration AS recurrence_duration,
+                       CASE recurrence.unit
+                           WHEN 'hour' THEN duration.hour
+                           WHEN 'day' THEN duration.day
+                           WHEN 'week' THEN duration.week
+                           WHEN 'month' THEN duration.month
+                           WHEN 'year' THEN duration.month / 12
+                       END AS duration
+                  FROM duration
+                  JOIN product_pricing pricing
+                    ON pricing.product_template_id = duration.product_tmpl_id
+                   AND (pricing.pricelist_id IS NULL OR pricing.pricelist_id = duration.pricelist_id)
+                  JOIN sale_temporal_recurrence recurrence ON recurrence.id = pricing.recurrence_id
+                 WHERE NOT EXISTS (
+                        SELECT 1
+                          FROM {variants_field.relation} rel
+                         WHERE rel.{variants_field.column1} = pricing.id
+                       )
+                    OR EXISTS (
+                        SELECT 1
+                          FROM {variants_field.relation} rel
+                         WHERE rel.{variants_field.column1} = pricing.id
+                           AND rel.{variants_field.column2} = duration.product_id
+                       )
+            ), best AS (
+                SELECT DISTINCT ON (candidate.line_id)
+                       candidate.line_id,
+                       candidate.pricing_id,
+                       candidate.total
+                  FROM (
+                        SELECT candidate.*,
+                               CASE
+                                   WHEN candidate.duration <= 0 OR candidate.recurrence_duration <= 0
+                                   THEN candidate.price
+                                   ELSE candidate.price * CEIL(candidate.duration / candidate.recurrence_duration)
+                               END AS total
+                          FROM candidate
+                       ) candidate
+              ORDER BY candidate.line_id,
+                       ABS(candidate.total),
+                       -- the pricings of the pricelist are preferred, then the order of the pricings
+                       candidate.pricelist_id IS NULL,
+                       {pricing_order},
+                       candidate.pricing_id
+            )
+            SELECT duration.id,
+                   best.pricing_id,
+                   ROUND(COALESCE(best.total, duration.list_price) / duration.rounding) * duration.rounding
+              FROM duration
+         LEFT JOIN best ON best.line_id = duration.id
+             WHERE NOT EXISTS (
+                    SELECT 1
+                      FROM candidate
+                     WHERE candidate.line_id = duration.id
+                       AND candidate.currency_id != duration.currency_id
+                   )
+        """, [tuple(self.ids)])
+        return {
+            line_id: (pricing_id or False, float(price_unit))
+            for line_id, pricing_id, price_unit in self.env.cr.fetchall()
+        }
+
+    def _reprice_rental_lines(self):
+        """Reprice the rental lines, e.g. after a change of the pricing rules.
+
+        The lines resolved by `_get_best_rental_pricings` are updated in a single query, the
+        other ones are priced by `_compute_price_unit`.
+        """
+        self.check_access_rights('write')
+        self.check_access_rule('write')
+        prices = self._get_best_rental_pricings()
+        repriced_lines = self.browse(list(prices))
+        if prices:
+            self.env.cr.execute("""
+                UPDATE sale_order_line line
+                   SET price_unit = price.price_unit,
+                       write_uid = %s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                  FROM (
+                        SELECT UNNEST(%s::integer[]) AS id,
+                               UNNEST(%s::numeric[]) AS price_unit
+                       ) price
+                 WHERE line.id = price.id
+            """, [self.env.uid, list(prices), [price_unit for __, price_unit in prices.values()]])
+            repriced_lines.invalidate_recordset(['price_unit', 'write_uid', 'write_date'])
+            repriced_lines.modified(['price_unit'])
+        (self - repriced_lines)._compute_price_unit()
+
     #=== ONCHANGE METHODS ===#
 
     @api.onchange('product_id')
@@ -244,6 +519,14 @@ class SaleOrderLine(models.Model):
 
     # === PRICE COMPUTING HOOKS === #
 
+    @rental_perf('sale.order.line._compute_price_unit')
+    def _compute_price_unit(self):
+        super()._compute_price_unit()
+
+    @rental_perf('sale.order.line._get_pricelist_price')
+    def _get_pricelist_price(self):
+        return super()._get_pricelist_price()
+
     def _get_price_computing_kwargs(self):
         """ Override to add the pricing duration or the start and end date of temporal line """
         price_computing_kwargs = super()._get_price_computing_kwargs()
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
-from odoo import fields, models, tools
+from odoo import api, fields, models, tools
+
+from odoo.addons.sale_renting.models.rental_perf_stat import rental_perf
 
 
 class RentalReport(models.Model):
@@ -30,6 +32,10 @@ class RentalReport(models.Model):
     price = fields.Float('Daily Amount', readonly=True)
     currency_id = fields.Many2one('res.currency', 'Currency', readonly=True)
 
+    @api.model
+    @rental_perf('sale.rental.report.read_group', count=lambda self, groups: len(groups))
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        return super().read_group(domain, fields, groupby, offset=offset, limit=limit, orderby=orderby, lazy=lazy)
 
     def _quantity(self):
         return """
@@ -1,7 +1,14 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
+import math
+
 from odoo import api, fields, models, tools
 
+from odoo.addons.sale_renting.models.rental_perf_stat import rental_perf
+
+# Number of rentable products displayed per page in the Gantt view, besides the ones having rentals.
+RENTAL_PRODUCTS_PAGE_SIZE = 80
+
 
 class RentalSchedule(models.Model):
     _name = "sale.rental.schedule"
@@ -16,12 +23,31 @@ class RentalSchedule(models.Model):
 
     @api.model
     def _read_group_product_ids(self, products, domain, order):
+        """Show a row for every rentable product, not only for the ones having rentals.
+
+        Large catalogs are paginated: the products having rentals are always displayed,
+        along with a page of the other rentable products, selected through the
+        `rental_products_offset` and `rental_products_limit` context keys.
+        """
         if self._context.get('restrict_renting_products'):
             return products
-        all_rental_products = products.search([('rent_ok', '=', True)], order=order)
-        if len(all_rental_products) > 80:
-            return products
-        return all_rental_products
+        limit = self._context.get('rental_products_limit') or RENTAL_PRODUCTS_PAGE_SIZE
+        offset = self._context.get('rental_products_offset') or 0
+        return products | products.search(
+            products._get_rental_products_domain(), offset=offset, limit=limit, order=order)
+
+    @api.model
+    def get_rental_products_page_count(self):
+        """Number of pages of rentable products available in the Gantt view."""
+        limit = self._context.get('rental_products_limit') or RENTAL_PRODUCTS_PAGE_SIZE
+        Product = self.env['product.product']
+        product_count = Product.search_count(Product._get_rental_products_domain())
+        return max(1, math.ceil(product_count / limit))
+
+    @api.model
+    @rental_perf('sale.rental.schedule.read_group', count=lambda self, groups: len(groups))
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        return super().read_group(domain, fields, groupby, offset=offset, limit=limit, orderby=orderby, lazy=lazy)
 
     name = fields.Char('Order Reference', readonly=True)
     product_name = fields.Char('Product Reference', readonly=True)
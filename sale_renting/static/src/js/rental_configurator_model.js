@@ -1,7 +1,16 @@
 /** @odoo-module */
+import { serializeDateTime } from "@web/core/l10n/dates";
+import { _t } from "@web/core/l10n/translation";
 import { registry } from "@web/core/registry";
 import { formView } from "@web/views/form/form_view";
 import { Record, RelationalModel } from "@web/views/basic_relational_model";
+import { mapWowlValueToLegacy } from "@web/views/legacy_utils";
+import { computeRentalQuote } from "./rental_pricing";
+
+// Delay, in milliseconds, before asking the server to confirm the price of the edited period
+export const RENTAL_QUOTE_DELAY = 300;
+// Fields priced client side then confirmed by the server, without onchange
+const RENTAL_QUOTE_FIELDS = ["pickup_date", "return_date", "quantity"];
 
 /**
  * This model is overridden to allow configuring sale_order_lines through a popup
@@ -9,16 +18,166 @@ import { Record, RelationalModel } from "@web/views/basic_relational_model";
  *
  */
 export class RentalConfiguratorRelationalModel extends RelationalModel {
-    setup(params, { action }) {
+    setup(params, { action, notification, rpc }) {
         super.setup(...arguments);
         this.action = action;
+        this.notification = notification;
+        this.rpc = rpc;
+        this.rentalPricingTable = null;
+    }
+
+    /**
+     * Prefetch the pricing rules of the product, so that the rental price can be
+     * updated client side while the dates are being edited.
+     *
+     * @override
+     */
+    async load() {
+        await super.load(...arguments);
+        this.rentalPricingTable = await this.rpc(
+            "/sale_renting/rental_pricing_table",
+            this.root._getRentalPricingParams()
+        );
     }
 }
 
-RentalConfiguratorRelationalModel.services = [...RelationalModel.services, "action"];
+RentalConfiguratorRelationalModel.services = [
+    ...RelationalModel.services,
+    "action",
+    "notification",
+    "rpc",
+];
 
 export class RentalConfiguratorRecord extends Record {
 
+    _getRentalPricingParams() {
+        const taxIds = this.context.sale_order_line_tax_ids;
+        return {
+            product_id: this.data.product_id && this.data.product_id[0],
+            pricelist_id: this.data.pricelist_id && this.data.pricelist_id[0],
+            tax_ids: taxIds === undefined ? null : taxIds || [],
+            company_id: this.data.company_id && this.data.company_id[0],
+        };
+    }
+
+    /**
+     * Price the rental period with the prefetched pricing table, without waiting for
+     * the server.
+     *
+     * @param {Object} changes changed values of the record
+     * @returns {Object} values of the locally priced period
+     */
+    _computeLocalRentalPrice(changes) {
+        const table = this.model.rentalPricingTable;
+        const pickupDate = changes.pickup_date || this.data.pickup_date;
+        const returnDate = changes.return_date || this.data.return_date;
+        if (!table || !pickupDate || !returnDate || pickupDate >= returnDate) {
+            return {};
+        }
+        const quote = computeRentalQuote(table, pickupDate, returnDate);
+        const values = {
+            duration: quote.duration,
+            duration_unit: quote.durationUnit,
+        };
+        if (quote.unitPrice !== null && !this._manualUnitPrice) {
+            values.unit_price = quote.unitPrice;
+        }
+        return values;
+    }
+
+    /**
+     * Apply changes to the record without the onchange round trip.
+     *
+     * @param {Object} changes
+     */
+    async _updateWithoutOnchange(changes) {
+        const legacyChanges = {};
+        for (const [fieldName, value] of Object.entries(changes)) {
+            legacyChanges[fieldName] = mapWowlValueToLegacy(value, this.fields[fieldName].type);
+        }
+        await this.model.__bm__.notifyChanges(this.__bm_handle__, legacyChanges, {
+            notifyChange: false,
+        });
+        this.__syncData();
+        this.model.notify();
+    }
+
+    /**
+     * The period and the quantity are priced client side and confirmed by the debounced
+     * call to /sale_renting/rental_quote, instead of an onchange per change.
+     *
+     * @override
+     */
+    async update(changes) {
+        if (Object.keys(changes).every((fieldName) => RENTAL_QUOTE_FIELDS.includes(fieldName))) {
+            // like the onchange, a new period reprices the line
+            this._manualUnitPrice = false;
+            await this._updateWithoutOnchange({ ...changes, ...this._computeLocalRentalPrice(changes) });
+            this._scheduleRentalQuote();
+            return;
+        }
+        if ("unit_price" in changes) {
+            // manually set price: keep it until the period changes
+            this._manualUnitPrice = true;
+        }
+        return super.update(changes);
+    }
+
+    /**
+     * Ask the server for the price of the period once the user stopped editing it.
+     */
+    _scheduleRentalQuote() {
+        // outdate the answers of the previous periods
+        this._rentalQuoteId = (this._rentalQuoteId || 0) + 1;
+        clearTimeout(this._rentalQuoteTimeout);
+        this._rentalQuoteTimeout = setTimeout(() => {
+            this._rentalQuoteTimeout = null;
+            this._rentalQuotePromise = this._fetchRentalQuote();
+        }, RENTAL_QUOTE_DELAY);
+    }
+
+    /**
+     * Replace the locally computed values by the server ones, unless the period changed
+     * in the meantime. A manually set price is kept.
+     */
+    async _fetchRentalQuote() {
+        const quoteId = this._rentalQuoteId;
+        const { pickup_date: pickupDate, return_date: returnDate } = this.data;
+        if (!pickupDate || !returnDate || pickupDate >= returnDate) {
+            return;
+        }
+        const quote = await this.model.rpc("/sale_renting/rental_quote", {
+            ...this._getRentalPricingParams(),
+            pickup_date: serializeDateTime(pickupDate),
+            return_date: serializeDateTime(returnDate),
+            quantity: this.data.quantity,
+        });
+        if (quoteId !== this._rentalQuoteId) {
+            return;
+        }
+        const values = {
+            duration: quote.duration,
+            duration_unit: quote.duration_unit,
+            pricing_explanation: quote.pricing_explanation,
+        };
+        if (!this._manualUnitPrice) {
+            values.unit_price = quote.unit_price;
+        }
+        await this._updateWithoutOnchange(values);
+    }
+
+    /**
+     * Wait for the price of the current period to be confirmed by the server.
+     */
+    async _confirmRentalPrice() {
+        if (this._rentalQuoteTimeout) {
+            clearTimeout(this._rentalQuoteTimeout);
+            this._rentalQuoteTimeout = null;
+            this._rentalQuotePromise = this._fetchRentalQuote();
+        }
+        await this._rentalQuotePromise;
+    }
+
     _getRentalInfos() {
         return {
             start_date: this.data.pickup_date,
@@ -30,14 +189,22 @@ export class RentalConfiguratorRecord extends Record {
     }
 
     /**
-     * We let the regular process take place to allow the validation of the required fields
-     * to happen.
+     * Once the price of the period is confirmed by the server, we let the regular process
+     * take place to allow the validation of the required fields to happen.
      *
      * Then we can manually close the window, providing rental information to the caller.
      *
      * @override
      */
     async save() {
+        if (this.data.pickup_date >= this.data.return_date) {
+            this.model.notification.add(
+                _t("Please choose a return date that is after the pickup date."),
+                { type: "danger" }
+            );
+            return false;
+        }
+        await this._confirmRentalPrice();
         const isSaved = await super.save(...arguments);
         if (!isSaved) {
             return false;
@@ -0,0 +1,102 @@
+/** @odoo-module **/
+
+import { roundPrecision } from "@web/core/utils/numbers";
+
+/**
+ * Client side pricing of the rental configurator, based on the pricing table given by
+ * rental.wizard.get_rental_pricing_table.
+ *
+ * It mirrors product.pricing._compute_duration_vals, product.template._get_best_pricing_rule
+ * and rental.wizard._compute_unit_price: any change there has to be reported here
+ * (see static/tests/rental_pricing_tests.js and test_rental_pricing_parity).
+ */
+
+/**
+ * @param {luxon.DateTime} pickupDate
+ * @param {luxon.DateTime} returnDate
+ * @returns {Object} duration of the period in each pricing unit
+ */
+export function computeDurationVals(pickupDate, returnDate) {
+    const start = pickupDate.toUTC();
+    const end = returnDate.toUTC();
+    const hour = Math.floor(end.diff(start, "seconds").seconds) / 3600;
+    const day = Math.ceil(hour / 24);
+    const week = Math.ceil(day / 7);
+    const diff = end.diff(start, ["years", "months", "days", "hours", "minutes", "seconds"]);
+    let month = diff.days || diff.hours || diff.minutes ? 1 : 0;
+    month += diff.months + diff.years * 12;
+    return { hour, day, week, month, year: month / 12 };
+}
+
+/**
+ * @param {Object} pricing pricing of the pricing table
+ * @param {number} duration duration in the pricing unit
+ * @returns {number} price in the pricing currency
+ */
+export function computePricingPrice(pricing, duration) {
+    if (duration <= 0 || pricing.duration <= 0) {
+        return pricing.price;
+    }
+    return pricing.price * Math.ceil(duration / pricing.duration);
+}
+
+function convert(table, pricing, amount) {
+    return roundPrecision(amount * pricing.rate, table.rounding);
+}
+
+/**
+ * @param {Object} table pricing table
+ * @param {Object} durationVals see computeDurationVals
+ * @returns {Object|null} least expensive pricing for the given duration
+ */
+export function getBestPricing(table, durationVals) {
+    let bestPricing = null;
+    let minPrice = Infinity;
+    for (const pricing of table.pricings) {
+        let price = computePricingPrice(pricing, durationVals[pricing.unit]);
+        if (pricing.currency_id !== table.currency_id) {
+            price = convert(table, pricing, price);
+        }
+        // Compare the absolute prices so that negative pricings (promotions) are not always chosen
+        if (Math.abs(price) < Math.abs(minPrice)) {
+            minPrice = price;
+            bestPricing = pricing;
+        }
+    }
+    return bestPricing;
+}
+
+/**
+ * @param {Object} table pricing table
+ * @param {luxon.DateTime} pickupDate
+ * @param {luxon.DateTime} returnDate
+ * @returns {Object} pricing, duration and unit price (null if it has to be computed server side)
+ */
+export function computeRentalQuote(table, pickupDate, returnDate) {
+    const durationVals = computeDurationVals(pickupDate, returnDate);
+    const pricing = getBestPricing(table, durationVals);
+    const durationUnit = pricing ? pricing.unit : "day";
+    // the duration of the configurator is an integer field
+    const duration = Math.trunc(durationVals[durationUnit]);
+    let unitPrice = null;
+    if (!table.local_price) {
+        unitPrice = null;
+    } else if (table.has_pricelist) {
+        unitPrice = pricing
+            ? convert(table, pricing, computePricingPrice(pricing, durationVals[pricing.unit]))
+            : roundPrecision(table.list_price, table.rounding);
+    } else if (pricing && duration > 0) {
+        unitPrice = computePricingPrice(pricing, duration);
+        if (pricing.currency_id !== table.currency_id) {
+            unitPrice = convert(table, pricing, unitPrice);
+        }
+    } else if (duration > 0) {
+        unitPrice = table.lst_price;
+    }
+    return {
+        pricingId: pricing ? pricing.id : false,
+        duration,
+        durationUnit,
+        unitPrice,
+    };
+}
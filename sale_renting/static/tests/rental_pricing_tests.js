@@ -0,0 +1,133 @@
+/** @odoo-module **/
+
+import {
+    computeDurationVals,
+    computeRentalQuote,
+    getBestPricing,
+} from "@sale_renting/js/rental_pricing";
+
+const { DateTime } = luxon;
+
+/**
+ * Pricing tables shaped like the result of rental.wizard.get_rental_pricing_table.
+ * The pricings cost 3.50 per hour, 80.00 per day and 300.00 per month.
+ */
+function makeTable(params = {}) {
+    return Object.assign(
+        {
+            currency_id: 1,
+            rounding: 0.01,
+            has_pricelist: false,
+            list_price: 100,
+            lst_price: 110,
+            local_price: true,
+            pricings: [
+                { id: 1, duration: 1, unit: "hour", price: 3.5, currency_id: 1, rate: 1 },
+                { id: 2, duration: 1, unit: "day", price: 80, currency_id: 1, rate: 1 },
+                { id: 3, duration: 1, unit: "month", price: 300, currency_id: 1, rate: 1 },
+            ],
+        },
+        params
+    );
+}
+
+function utc(iso) {
+    return DateTime.fromISO(iso, { zone: "utc" });
+}
+
+QUnit.module("sale_renting", {}, function () {
+    QUnit.module("rental_pricing");
+
+    QUnit.test("duration of periods ending on a month end", function (assert) {
+        // relativedelta(2023-02-28, 2023-01-31) is 28 days: a single month is started
+        let durationVals = computeDurationVals(utc("2023-01-31T10:00:00"), utc("2023-02-28T10:00:00"));
+        assert.deepEqual(
+            [durationVals.day, durationVals.week, durationVals.month],
+            [28, 4, 1]
+        );
+        // relativedelta(2023-03-01, 2023-01-31) is 1 month and 1 day
+        durationVals = computeDurationVals(utc("2023-01-31T10:00:00"), utc("2023-03-01T10:00:00"));
+        assert.deepEqual([durationVals.day, durationVals.month], [29, 2]);
+        // relativedelta(2024-02-29, 2024-01-31) is 29 days, leap year
+        durationVals = computeDurationVals(utc("2024-01-31T10:00:00"), utc("2024-02-29T10:00:00"));
+        assert.deepEqual([durationVals.day, durationVals.month], [29, 1]);
+        // relativedelta(2023-04-30, 2023-03-31) is exactly 1 month
+        durationVals = computeDurationVals(utc("2023-03-31T10:00:00"), utc("2023-04-30T10:00:00"));
+        assert.deepEqual([durationVals.day, durationVals.month, durationVals.year], [30, 1, 1 / 12]);
+        // a started hour counts for a month
+        durationVals = computeDurationVals(utc("2023-03-31T10:00:00"), utc("2023-04-30T11:00:00"));
+        assert.strictEqual(durationVals.month, 2);
+
+        const quote = computeRentalQuote(makeTable(), utc("2023-01-31T10:00:00"), utc("2023-03-01T10:00:00"));
+        assert.deepEqual(quote, { pricingId: 3, duration: 2, durationUnit: "month", unitPrice: 600 });
+    });
+
+    QUnit.test("the pricelist prices the started periods", function (assert) {
+        const pickupDate = utc("2023-06-01T08:00:00");
+        const returnDate = utc("2023-06-02T04:30:00");
+        // 20h30: 21 started hours cost less than a day
+        assert.deepEqual(
+            computeRentalQuote(makeTable(), pickupDate, returnDate),
+            { pricingId: 1, duration: 20, durationUnit: "hour", unitPrice: 70 },
+            "without pricelist, the price follows the integer duration of the configurator"
+        );
+        assert.deepEqual(
+            computeRentalQuote(makeTable({ has_pricelist: true }), pickupDate, returnDate),
+            { pricingId: 1, duration: 20, durationUnit: "hour", unitPrice: 73.5 },
+            "with a pricelist, the price of the pricing applies to the whole period"
+        );
+
+        const table = makeTable({ pricings: [] });
+        assert.strictEqual(
+            computeRentalQuote(table, pickupDate, returnDate).unitPrice,
+            110,
+            "without pricing, the sales price of the variant applies"
+        );
+        table.has_pricelist = true;
+        table.list_price = 99.999;
+        assert.strictEqual(
+            computeRentalQuote(table, pickupDate, returnDate).unitPrice,
+            100,
+            "without pricing, the pricelist price is the rounded list price"
+        );
+        table.local_price = false;
+        assert.strictEqual(
+            computeRentalQuote(table, pickupDate, returnDate).unitPrice,
+            null,
+            "mapped taxes are applied server side"
+        );
+    });
+
+    QUnit.test("pricings in another currency are converted", function (assert) {
+        const table = makeTable({
+            currency_id: 2,
+            has_pricelist: true,
+            pricings: [
+                { id: 1, duration: 1, unit: "day", price: 40, currency_id: 2, rate: 1 },
+                { id: 2, duration: 1, unit: "day", price: 30, currency_id: 1, rate: 1.333 },
+            ],
+        });
+        const pickupDate = utc("2023-06-01T08:00:00");
+        const returnDate = utc("2023-06-04T08:00:00");
+        // 3 days: 120.00 against 90.00 * 1.333 = 119.97
+        assert.strictEqual(getBestPricing(table, computeDurationVals(pickupDate, returnDate)).id, 2);
+        assert.deepEqual(computeRentalQuote(table, pickupDate, returnDate), {
+            pricingId: 2,
+            duration: 3,
+            durationUnit: "day",
+            unitPrice: 119.97,
+        });
+
+        table.has_pricelist = false;
+        assert.strictEqual(computeRentalQuote(table, pickupDate, returnDate).unitPrice, 119.97);
+
+        // the cheapest pricing is chosen once converted: 90.00 * 1.5 = 135.00
+        table.pricings[1].rate = 1.5;
+        assert.deepEqual(computeRentalQuote(table, pickupDate, returnDate), {
+            pricingId: 1,
+            duration: 3,
+            durationUnit: "day",
+            unitPrice: 120,
+        });
+    });
+});
@@ -1 +1,3 @@
 from . import test_rental
+from . import test_rental_benchmark
+from . import test_rental_query_count
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from datetime import timedelta
+import json
+
+from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
-from odoo import fields
-from odoo.tools import float_compare
+from odoo import Command, fields
+from odoo.exceptions import AccessError, UserError, ValidationError
+from odoo.tools import float_compare, format_datetime, format_time
 from odoo.tests import HttpCase, tagged, TransactionCase
+from odoo.tests.common import new_test_user
+
+from odoo.addons.sale_renting import _fill_deposit, _fill_partner_risk
+from odoo.addons.sale_renting.models import rental_perf_stat
+from odoo.addons.sale_renting.cli.rental_indexes import get_rental_index_usage, RENTAL_INDEXES
 
 
 class TestRentalCommon(TransactionCase):
@@ -609,6 +617,778 @@ class TestRentalCommon(TransactionCase):
         self.assertTrue(float_compare(wizard_context.unit_price, 60, precision_rounding=2),
                         'Included tax related to another company should not apply')
 
+    def test_schedule_rental_products_rows(self):
+        Schedule = self.env['sale.rental.schedule']
+        Product = self.env['product.product']
+        rows = Schedule._read_group_product_ids(Product, [], 'id')
+        self.assertIn(self.product_id, rows, "Rentable products without rentals should have a row")
+
+        self.product_template_id.rent_ok = False
+        rows = Schedule._read_group_product_ids(Product, [], 'id')
+        self.assertNotIn(self.product_id, rows, "Products no longer rentable should not have a row")
+
+        self.product_template_id.rent_ok = True
+        rental_products = Product.search(Product._get_rental_products_domain(), order='id')
+        pages = Schedule.with_context(rental_products_limit=1).get_rental_products_page_count()
+        self.assertEqual(pages, max(1, len(rental_products)))
+        for offset, product in enumerate(rental_products):
+            rows = Schedule.with_context(
+                rental_products_limit=1, rental_products_offset=offset,
+            )._read_group_product_ids(Product, [], 'id')
+            self.assertEqual(rows, product, "Each page should display the next rentable product")
+        rows = Schedule._read_group_product_ids(self.product_id, [], 'id')
+        self.assertIn(self.product_id, rows, "The products having rentals are displayed on every page")
+
+        # the products of the companies not allowed are not displayed
+        self.product_template_id.company_id = self.env['res.company'].create({'name': 'Other company'})
+        rows = Schedule._read_group_product_ids(Product, [], 'id')
+        self.assertNotIn(self.product_id, rows)
+
+    def test_import_rental_orders(self):
+        partner = self.env['res.partner'].create({'name': 'A partner'})
+        pickup_date = fields.Datetime.now() + relativedelta(days=1, minute=0, second=0, microsecond=0)
+        orders_vals = [{
+            'partner_id': partner.id,
+            'order_line': [{
+                'product_id': self.product_id.id,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(hours=hours),
+            }, {
+                'product_id': self.product_id.id,
+                'product_uom_qty': 2,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(hours=hours),
+            }],
+        } for hours in (9, 20, 9)]
+
+        orders = self.env['sale.order'].import_rental_orders(orders_vals, batch_size=2)
+
+        self.assertEqual(len(orders), 3)
+        self.assertTrue(all(orders.mapped('is_rental_order')))
+        for order in orders:
+            self.assertTrue(all(order.order_line.mapped('is_rental')))
+            expected_price = order.pricelist_id._get_product_price(
+                self.product_id, 1.0, start_date=order.order_line[0].start_date,
+                end_date=order.order_line[0].return_date,
+            )
+            self.assertEqual(order.order_line.mapped('price_unit'), [expected_price] * 2)
+            self.assertEqual(order.order_line[1].deposit, 2 * order.order_line[0].deposit)
+
+    def test_rental_order_line_descriptions(self):
+        # the names are computed in the timezone of the user, make it deterministic
+        self.env.user.tz = 'UTC'
+        env = self.env(context=dict(self.env.context, tz='UTC'))
+        sale_order = env['sale.order'].create({
+            'partner_id': env['res.partner'].create({'name': 'A partner', 'lang': env.lang or 'en_US'}).id,
+        })
+        pickup_date = fields.Datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+        sols = env['sale.order.line'].create([{
+            'product_id': self.product_id.id,
+            'order_id': sale_order.id,
+            'start_date': pickup_date,
+            'return_date': pickup_date + relativedelta(hours=hours),
+            'is_rental': True,
+        } for hours in (1, 72)])
+
+        descriptions = sols.with_env(env)._get_rental_order_line_descriptions()
+        self.assertEqual(descriptions[sols[0].id], "\n%s to %s" % (
+            format_datetime(env, sols[0].start_date, tz='UTC', dt_format=False),
+            format_time(env, sols[0].return_date, tz='UTC', time_format=False),
+        ))
+        self.assertEqual(descriptions[sols[1].id], "\n%s to %s" % (
+            format_datetime(env, sols[1].start_date, tz='UTC', dt_format=False),
+            format_datetime(env, sols[1].return_date, tz='UTC', dt_format=False),
+        ))
+        self.assertTrue(sols[1].name.endswith(descriptions[sols[1].id]))
+
+    def test_shift_rental_period(self):
+        sale_order = self.env['sale.order'].create({
+            'partner_id': self.env['res.partner'].create({'name': 'A partner'}).id,
+        })
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        sols = self.env['sale.order.line'].create([{
+            'product_id': self.product_id.id,
+            'order_id': sale_order.id,
+            'start_date': pickup_date,
+            'return_date': pickup_date + relativedelta(hours=hours),
+            'is_rental': True,
+        } for hours in (9, 20)])
+        prices = sols.mapped('price_unit')
+
+        sale_order.shift_rental_period(delta=timedelta(weeks=1))
+        self.assertEqual(sols.mapped('start_date'), [pickup_date + timedelta(weeks=1)] * 2)
+        self.assertEqual(sols[1].return_date, pickup_date + timedelta(weeks=1, hours=20))
+        self.assertEqual(sols.mapped('reservation_begin'), sols.mapped('start_date'))
+        self.assertEqual(sols.mapped('price_unit'), prices, "Same durations should keep the same prices")
+
+        sale_order.shift_rental_period(delta=timedelta(0))
+        self.assertEqual(sols.mapped('start_date'), [pickup_date + timedelta(weeks=1)] * 2)
+        with self.assertRaises(UserError):
+            sale_order.shift_rental_period()
+
+        sols.shift_rental_period(start_date=pickup_date, return_date=pickup_date + relativedelta(hours=9))
+        self.assertEqual(sols.mapped('return_date'), [pickup_date + relativedelta(hours=9)] * 2)
+        self.assertEqual(sols[1].price_unit, prices[0])
+
+        # the users who cannot write the lines cannot move them either
+        employee = new_test_user(self.env, login='rental_employee', groups='base.group_user')
+        salesman = new_test_user(self.env, login='rental_salesman', groups='sales_team.group_sale_salesman')
+        sale_order.user_id = self.env.ref('base.user_admin')
+        for user in (employee, salesman):
+            with self.assertRaises(AccessError):
+                sols.with_user(user).shift_rental_period(delta=timedelta(days=1))
+            with self.assertRaises(AccessError):
+                sols.with_user(user)._reprice_rental_lines()
+        self.assertEqual(sols.mapped('start_date'), [pickup_date] * 2)
+
+    def test_rental_quote(self):
+        self.product_id.taxes_id = self.tax_included
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        return_date = pickup_date + relativedelta(hours=11)
+        wizard_count = self.env['rental.wizard'].search_count([])
+
+        quote = self.env['rental.wizard'].get_rental_quote(
+            self.product_id.id, pickup_date, return_date, quantity=2, tax_ids=self.tax_excluded.ids)
+
+        wizard = self.env['rental.wizard'].with_context(sale_order_line_tax_ids=self.tax_excluded.ids).create({
+            'product_id': self.product_id.id,
+            'pickup_date': pickup_date,
+            'return_date': return_date,
+            'quantity': 2,
+        })
+        wizard._compute_unit_price()
+        self.assertEqual(quote['pricing_id'], wizard.pricing_id.id)
+        self.assertEqual(quote['duration'], wizard.duration)
+        self.assertEqual(quote['duration_unit'], wizard.duration_unit)
+        self.assertEqual(quote['unit_price'], wizard.unit_price)
+        self.assertEqual(quote['pricing_explanation'], wizard.pricing_explanation)
+        self.assertEqual(self.env['rental.wizard'].search_count([]), wizard_count + 1,
+                         "Quoting should not create configurator records")
+
+    def test_rental_pricing_table(self):
+        """ The pricing table must give the configurator what it needs to price rentals
+        client side, see TestUi.test_rental_pricing_parity."""
+        table = self.env['rental.wizard'].get_rental_pricing_table(self.product_id.id)
+        self.assertTrue(table['local_price'])
+        self.assertFalse(table['has_pricelist'])
+        self.assertEqual(table['currency_id'], self.env.company.currency_id.id)
+        self.assertEqual(
+            {pricing['id'] for pricing in table['pricings']},
+            set(self.product_template_id.product_pricing_ids.ids),
+        )
+        self.assertTrue(all(pricing['rate'] == 1.0 for pricing in table['pricings']))
+        self.assertFalse(self.env['rental.wizard'].get_rental_pricing_table(
+            self.product_id.id, tax_ids=self.tax_excluded.ids)['local_price'],
+            "Mapped taxes can only be applied server side")
+
+    def test_pricing_unique_parameters(self):
+        attribute = self.env['product.attribute'].create({
+            'name': 'Color',
+            'value_ids': [Command.create({'name': name}) for name in ('Red', 'Blue', 'Green')],
+        })
+        template = self.env['product.template'].create({
+            'name': 'Board game',
+            'rent_ok': True,
+            'attribute_line_ids': [Command.create({
+                'attribute_id': attribute.id,
+                'value_ids': [Command.set(attribute.value_ids.ids)],
+            })],
+        })
+        red, blue, green = template.product_variant_ids
+        pricelist = self.env['product.pricelist'].create({'name': 'Pricelist A'})
+        # the pricings of several templates are validated at once
+        self.env['product.pricing'].create([
+            {'product_template_id': tmpl.id, 'recurrence_id': recurrence.id, 'pricelist_id': pricelist_id}
+            for tmpl in template | self.env['product.template'].create({'name': 'Chess', 'rent_ok': True})
+            for recurrence in (self.recurrence_5_hours, self.recurrence_daily)
+            for pricelist_id in (False, pricelist.id)
+        ])
+        self.env['product.pricing'].create({
+            'product_template_id': template.id,
+            'recurrence_id': self.recurrence_hourly.id,
+            'product_variant_ids': [Command.set((red | blue).ids)],
+        })
+        with self.assertRaises(ValidationError):
+            self.env['product.pricing'].create({
+                'product_template_id': template.id,
+                'recurrence_id': self.recurrence_hourly.id,
+                'product_variant_ids': [Command.set(blue.ids)],
+            })
+        # selecting all the variants is the same as selecting none
+        with self.assertRaises(ValidationError):
+            self.env['product.pricing'].create({
+                'product_template_id': template.id,
+                'recurrence_id': self.recurrence_daily.id,
+                'product_variant_ids': [Command.set((red | blue | green).ids)],
+            })
+        self.env['product.pricing'].create({
+            'product_template_id': template.id,
+            'recurrence_id': self.recurrence_hourly.id,
+            'product_variant_ids': [Command.set(green.ids)],
+        })
+
+    def test_apply_pricing_grid(self):
+        templates = self.env['product.template'].create([
+            {'name': 'Game %s' % i, 'rent_ok': True, 'list_price': 10.0 * (i + 1)} for i in range(3)
+        ])
+        pricelist = self.env['product.pricelist'].create({'name': 'Pricelist A'})
+        grid = {self.recurrence_daily.id: 10.0, self.recurrence_5_hours.id: 5.0}
+        Pricing = self.env['product.pricing']
+
+        pricings = Pricing._apply_pricing_grid(templates, grid)
+        self.assertEqual(len(pricings), 6)
+        self.assertFalse(
+            self.env.records_to_compute(Pricing._fields['price']),
+            "The prices are set by the query, they must not be recomputed")
+        self.assertEqual(templates.product_pricing_ids, pricings)
+        for pricing in pricings:
+            self.assertEqual(pricing.price_percent, grid[pricing.recurrence_id.id])
+            self.assertAlmostEqual(pricing.price, pricing.product_template_id.list_price * pricing.price_percent / 100)
+            self.assertEqual(pricing.currency_id, self.env.company.currency_id)
+
+        # applying a grid again updates the existing pricings of the pricelist
+        grid[self.recurrence_daily.id] = 20.0
+        self.assertEqual(Pricing._apply_pricing_grid(templates, grid), pricings)
+        self.assertEqual(templates[2].product_pricing_ids.filtered(
+            lambda p: p.recurrence_id == self.recurrence_daily).price, 6.0)
+        pricelist_pricings = Pricing._apply_pricing_grid(templates, grid, pricelist=pricelist)
+        self.assertFalse(pricelist_pricings & pricings)
+        self.assertEqual(pricelist_pricings.pricelist_id, pricelist)
+
+        # the stored prices follow the list price
+        templates[0].list_price = 50.0
+        self.assertEqual(sorted(templates[0].product_pricing_ids.mapped('price')), [2.5, 2.5, 10.0, 10.0])
+
+    def test_display_price(self):
+        template = self.env['product.template'].create({'name': 'Game', 'list_price': 20.0})
+        self.assertFalse(template.is_temporal)
+        self.assertEqual(template.display_price, "")
+        template.rent_ok = True
+        self.assertTrue(template.is_temporal)
+        self.assertIn("(fixed)", template.display_price)
+
+        pricing = self.env['product.pricing'].create({
+            'product_template_id': template.id,
+            'recurrence_id': self.recurrence_daily.id,
+            'price_percent': 10.0,
+        })
+        self.assertEqual(template.display_price, pricing.description)
+        description = pricing.description
+        template.list_price = 40.0
+        self.assertNotEqual(template.display_price, description)
+        self.assertEqual(template.display_price, pricing.description)
+        self.assertEqual(
+            self.env['product.template'].search([('is_temporal', '=', True), ('id', '=', template.id)]), template)
+
+        # the leasing prices of several products are computed together
+        templates = template | template.copy({'name': 'Other Game'})
+        templates.invalidate_recordset(['display_price'])
+        self.assertEqual(templates.mapped('display_price'), [pricing.description] * 2)
+
+    def test_recurrence_unit_labels(self):
+        labels = self.env['sale.temporal.recurrence']._get_unit_labels()
+        self.assertEqual(labels['hour']['singular'], "Hour")
+        self.assertEqual(labels['hour']['plural'], "Hours")
+        self.assertIs(self.env['sale.temporal.recurrence']._get_unit_labels(), labels)
+
+        self.assertEqual(self.recurrence_hourly.duration_display, "1 hour")
+        self.assertEqual(self.recurrence_5_hours.duration_display, "5 hours")
+        self.assertEqual(self.recurrence_daily.subscription_unit_display, "per day")
+        self.assertEqual(self.recurrence_15_hours.subscription_unit_display, "per 15 hours")
+        pricings = self.product_template_id.product_pricing_ids
+        self.assertEqual(
+            set(pricings.mapped('name')), {"1 Hour", "5 Hours", "15 Hours", "1 Day"})
+
+    def test_recurrence_duration_hours(self):
+        self.assertEqual(self.recurrence_15_hours.duration_hours, 15)
+        self.assertEqual(self.recurrence_daily.duration_hours, 24)
+        recurrence = self.env['sale.temporal.recurrence'].create({'duration': 2, 'unit': 'week'})
+        self.assertEqual(recurrence.duration_hours, 2 * 24 * 7)
+        self.assertEqual(recurrence.get_recurrence_timedelta(), relativedelta(weeks=2))
+        recurrence.write({'duration': 3, 'unit': 'day'})
+        self.assertEqual(recurrence.duration_hours, 3 * 24)
+        self.assertEqual(recurrence.get_recurrence_timedelta(), relativedelta(days=3))
+        self.assertEqual(
+            self.env['sale.temporal.recurrence'].search(
+                [('id', 'in', (recurrence | self.recurrence_15_hours).ids)], order='duration_hours'),
+            self.recurrence_15_hours | recurrence)
+
+    def test_reprice_rental_lines(self):
+        template = self.env['product.template'].create({'name': 'Console', 'rent_ok': True, 'list_price': 100.0})
+        product = template.product_variant_id
+        for recurrence, percent in (
+            (self.recurrence_hourly, 3.5), (self.recurrence_5_hours, 15.0),
+            (self.recurrence_15_hours, 40.0), (self.recurrence_daily, 60.0),
+        ):
+            self.env['product.pricing'].create({
+                'product_template_id': template.id,
+                'recurrence_id': recurrence.id,
+                'price_percent': percent,
+            })
+        partner = self.env['res.partner'].create({'name': 'A partner'})
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        periods = (
+            relativedelta(hours=1), relativedelta(hours=9), relativedelta(hours=11), relativedelta(hours=16),
+            relativedelta(hours=20, minutes=30), relativedelta(days=2), relativedelta(months=1, days=3),
+        )
+        order = self.env['sale.order'].create({
+            'partner_id': partner.id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': product.id,
+                'is_rental': True,
+                'start_date': pickup_date,
+                'return_date': pickup_date + period,
+            }) for period in periods],
+        })
+        lines = order.order_line
+        self.assertEqual(len(lines), len(periods))
+
+        best_pricings = lines._get_best_rental_pricings()
+        for line in lines:
+            best_pricing = product._get_best_pricing_rule(
+                start_date=line.start_date, end_date=line.return_date,
+                pricelist=order.pricelist_id, currency=order.currency_id)
+            self.assertEqual(best_pricings[line.id], (best_pricing.id, line.price_unit))
+
+        # same price: the first pricing in the order of product.pricing wins
+        tied_template = self.env['product.template'].create({'name': 'Arcade', 'rent_ok': True, 'list_price': 100.0})
+        self.env['product.pricing'].create([{
+            'product_template_id': tied_template.id,
+            'recurrence_id': recurrence.id,
+            'price_percent': 50.0,
+        } for recurrence in (self.recurrence_daily, self.recurrence_15_hours)])
+        tied_line, dozen_line = self.env['sale.order.line'].create([{
+            'order_id': order.id,
+            'product_id': tied_template.product_variant_id.id,
+            'is_rental': True,
+            'start_date': pickup_date,
+            'return_date': pickup_date + relativedelta(hours=15),
+        }, {
+            'order_id': order.id,
+            'product_id': product.id,
+            'product_uom': self.env.ref('uom.product_uom_dozen').id,
+            'is_rental': True,
+            'start_date': pickup_date,
+            'return_date': pickup_date + relativedelta(days=2),
+        }])
+        best_pricings = (tied_line | dozen_line)._get_best_rental_pricings()
+        best_pricing = tied_template._get_best_pricing_rule(
+            start_date=tied_line.start_date, end_date=tied_line.return_date,
+            pricelist=order.pricelist_id, currency=order.currency_id)
+        self.assertEqual(best_pricing.recurrence_id, self.recurrence_15_hours)
+        self.assertEqual(best_pricings[tied_line.id], (best_pricing.id, tied_line.price_unit))
+        self.assertNotIn(dozen_line.id, best_pricings, "The prices of other units are converted by the ORM")
+        (tied_line | dozen_line).unlink()
+
+        # month ends: the months are counted like relativedelta, 03-31 + 1 month being 04-30
+        recurrence_monthly = self.env['sale.temporal.recurrence'].create({'duration': 1, 'unit': 'month'})
+        monthly_template = self.env['product.template'].create({'name': 'Pinball', 'rent_ok': True, 'list_price': 100.0})
+        monthly_pricing, __ = self.env['product.pricing'].create([{
+            'product_template_id': monthly_template.id,
+            'recurrence_id': recurrence.id,
+            'price_percent': percent,
+        } for recurrence, percent in ((recurrence_monthly, 100.0), (self.recurrence_daily, 50.0))])
+        month_end_lines = self.env['sale.order.line'].create([{
+            'order_id': order.id,
+            'product_id': monthly_template.product_variant_id.id,
+            'is_rental': True,
+            'start_date': start_date,
+            'return_date': return_date,
+        } for start_date, return_date in (
+            (datetime(2031, 3, 31, 10), datetime(2031, 4, 30, 11)),
+            (datetime(2031, 1, 31, 10), datetime(2031, 2, 28, 11)),
+            (datetime(2031, 1, 31, 10), datetime(2031, 3, 1, 10)),
+            (datetime(2031, 3, 31, 10), datetime(2031, 4, 30, 10)),
+        )])
+        best_pricings = month_end_lines._get_best_rental_pricings()
+        self.assertEqual(month_end_lines.mapped('price_unit'), [200.0, 200.0, 200.0, 100.0])
+        for line in month_end_lines:
+            self.assertEqual(best_pricings[line.id], (monthly_pricing.id, line.price_unit))
+        month_end_lines.unlink()
+
+        # change the tariff: the lines are repriced like the ORM would
+        template.product_pricing_ids.filtered(lambda p: p.recurrence_id == self.recurrence_daily).price_percent = 30.0
+        lines._reprice_rental_lines()
+        repriced = lines.mapped('price_unit')
+        lines._compute_price_unit()
+        self.assertEqual(lines.mapped('price_unit'), repriced)
+        self.assertEqual(order.amount_untaxed, sum(lines.mapped('price_subtotal')))
+
+    def test_risk_events(self):
+        partner = self.env['res.partner'].create({'name': 'A partner'})
+        order = self.env['sale.order'].create({'partner_id': partner.id, 'is_rental_order': True})
+        RiskEvent = self.env['rental.risk.event']
+        self.env.company.write({'rental_risk_defect': 0.5, 'rental_risk_max': 1.8})
+
+        for event_type in ('pickup', 'defect', 'late', 'return', 'return'):
+            RiskEvent._record_order_events(order, event_type)
+        self.assertEqual(partner.risk, 1.0, "The risk is only updated by the batch job")
+        self.assertEqual(len(RiskEvent._process_risk_events()), 5)
+        # 1.0 -> 1.5 -> 1.75 -> 1.4 -> 1.12
+        self.assertAlmostEqual(partner.risk, 1.12)
+        self.assertFalse(RiskEvent._process_risk_events())
+
+        RiskEvent._record_order_events(order, 'defect')
+        RiskEvent._record_order_events(order, 'defect')
+        RiskEvent._process_risk_events(limit=1)
+        self.assertAlmostEqual(partner.risk, 1.62)
+        RiskEvent._process_risk_events(limit=1)
+        self.assertAlmostEqual(partner.risk, 1.8)
+        self.assertEqual(len(partner.rental_risk_event_ids), 7)
+
+    def test_deposit_partner_risk_snapshot(self):
+        partner = self.env['res.partner'].create({'name': 'A partner', 'risk': 1.0})
+        self.product_template_id.list_price = 100.0
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        confirmed_order, quotation = self.env['sale.order'].create([{
+            'partner_id': partner.id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': self.product_id.id,
+                'is_rental': True,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(days=1),
+            })],
+        } for __ in range(2)])
+        confirmed_order.action_confirm()
+        self.assertEqual(confirmed_order.order_line.deposit, 50.0)
+
+        partner.risk = 1.5
+        self.assertTrue(partner.rental_risk_refresh)
+        self.assertEqual(quotation.partner_risk, 1.0, "The quotations are updated in batch")
+        self.assertEqual(self.env['sale.order']._refresh_queued_partner_risk(), partner)
+        self.assertFalse(partner.rental_risk_refresh)
+        self.assertEqual(quotation.partner_risk, 1.5)
+        self.assertEqual(quotation.order_line.deposit, 75.0)
+        self.assertEqual(confirmed_order.partner_risk, 1.0, "The risk is frozen at the confirmation")
+        self.assertEqual(confirmed_order.order_line.deposit, 50.0)
+
+    def test_piece_valuation(self):
+        self.product_template_id.list_price = 100.0
+        piece = self.env['product.piece'].create({
+            'product_template_id': self.product_template_id.id,
+            'name': 'Meeple',
+            'qty': 10,
+            'group_value': 20.0,
+        })
+        self.assertEqual(piece.individual_value, 2.0)
+        partner = self.env['res.partner'].create({'name': 'A partner'})
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        order = self.env['sale.order'].create({
+            'partner_id': partner.id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': self.product_id.id,
+                'is_rental': True,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(days=1),
+            })],
+        })
+        self.assertEqual(order.deposit, 50.0)
+        defect = self.env['product.piece.defect'].create({
+            'order_line_id': order.order_line.id,
+            'product_piece_id': piece.id,
+            'qty': 3,
+        })
+        self.assertEqual(defect.total, 6)
+        self.assertEqual(order.deposit, 44.0)
+
+        self.product_template_id.list_price = 200.0
+        self.assertEqual(piece.individual_value, 4.0)
+        self.assertEqual(defect.total, 12)
+        self.assertEqual(order.deposit, 88.0)
+
+    def test_register_defects(self):
+        self.product_template_id.list_price = 100.0
+        meeple, dice = self.env['product.piece'].create([{
+            'product_template_id': self.product_template_id.id,
+            'name': name,
+            'qty': 10,
+            'group_value': 10.0,
+        } for name in ('Meeple', 'Dice')])
+        partner = self.env['res.partner'].create({'name': 'A partner'})
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        order = self.env['sale.order'].create({
+            'partner_id': partner.id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': self.product_id.id,
+                'is_rental': True,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(days=1),
+            }) for __ in range(2)],
+        })
+        line_1, line_2 = order.order_line
+        wizard = self.env['rental.order.defect.wizard'].create({
+            'order_id': order.id,
+            'defect_line_ids': [
+                Command.create({'order_line_id': line_1.id, 'product_piece_id': meeple.id, 'qty': 2}),
+                Command.create({'order_line_id': line_1.id, 'product_piece_id': dice.id, 'qty': 1}),
+                Command.create({'order_line_id': line_2.id, 'product_piece_id': meeple.id, 'qty': 5}),
+            ],
+        })
+        wizard.apply()
+        self.assertEqual(line_1.defects.mapped('qty'), [2, 1])
+        self.assertEqual(line_2.defects.product_piece_id, meeple)
+        self.assertEqual(order.deposit, 100.0 - 8)
+
+        other_piece = self.env['product.piece'].create({
+            'product_template_id': self.env['product.template'].create({'name': 'Chess'}).id,
+            'name': 'Pawn',
+        })
+        with self.assertRaises(UserError):
+            order._register_defects([{'order_line_id': line_1.id, 'product_piece_id': other_piece.id, 'qty': 1}])
+        with self.assertRaises(UserError):
+            order._register_defects([{'order_line_id': line_1.id, 'product_piece_id': dice.id, 'qty': 0}])
+        for defect_vals in (
+            {'order_line_id': line_1.id, 'qty': 1},
+            {'order_line_id': str(line_1.id), 'product_piece_id': dice.id, 'qty': 1},
+            {'order_line_id': line_1.id, 'product_piece_id': dice.id, 'qty': '1'},
+            {'order_line_id': line_1.id, 'product_piece_id': other_piece.id + 1000, 'qty': 1},
+        ):
+            with self.assertRaises(UserError):
+                order._register_defects([defect_vals])
+
+    def test_missing_pieces(self):
+        meeple, dice = self.env['product.piece'].create([{
+            'product_template_id': self.product_template_id.id,
+            'name': name,
+            'qty': 10,
+        } for name in ('Meeple', 'Dice')])
+        partner = self.env['res.partner'].create({'name': 'A partner'})
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        order = self.env['sale.order'].create({
+            'partner_id': partner.id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': self.product_id.id,
+                'is_rental': True,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(days=1),
+            })],
+        })
+        self.assertFalse(self.product_template_id.pieces_missing)
+
+        defects = order._register_defects([
+            {'order_line_id': order.order_line.id, 'product_piece_id': meeple.id, 'qty': 2},
+            {'order_line_id': order.order_line.id, 'product_piece_id': meeple.id, 'qty': 1},
+            {'order_line_id': order.order_line.id, 'product_piece_id': dice.id, 'qty': 4},
+        ])
+        self.assertEqual((meeple.defect_count, meeple.qty_lost, meeple.qty_missing), (2, 3, 3))
+        self.assertEqual(self.product_template_id.pieces_missing, 7)
+        self.assertEqual(self.env['product.template'].get_incomplete_products(), [{
+            'id': self.product_template_id.id,
+            'name': self.product_template_id.display_name,
+            'pieces_missing': 7,
+            'pieces': [
+                {'id': dice.id, 'name': 'Dice', 'qty_missing': 4},
+                {'id': meeple.id, 'name': 'Meeple', 'qty_missing': 3},
+            ],
+        }])
+
+        defects.filtered(lambda defect: defect.product_piece_id == dice).processed = True
+        self.assertEqual((dice.defect_count, dice.qty_lost, dice.qty_missing), (1, 4, 0))
+        self.assertEqual(self.product_template_id.pieces_missing, 3)
+        defects.processed = True
+        self.assertFalse(self.env['product.template'].search(
+            [('id', '=', self.product_template_id.id), ('pieces_missing', '>', 0)]))
+
+    def test_perf_instrumentation(self):
+        PerfStat = self.env['rental.perf.stat']
+        PerfStat._flush_samples()
+        self.env['ir.config_parameter'].sudo().set_param('sale_renting.perf_instrumentation', True)
+        self.assertTrue(PerfStat._is_enabled())
+
+        partner = self.env['res.partner'].create({'name': 'A partner'})
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        order = self.env['sale.order'].create({
+            'partner_id': partner.id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': self.product_id.id,
+                'is_rental': True,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(days=1),
+            })],
+        })
+        order.action_confirm()
+        self.assertEqual(order.rental_status, 'pickup')
+        self.env['sale.rental.report'].read_group([('order_id', '=', order.id)], ['price:sum'], ['product_id'])
+
+        stats = PerfStat._flush_samples()
+        for operation in (
+            'sale.order._compute_rental_status',
+            'sale.order.line._compute_price_unit',
+            'product.template._get_best_pricing_rule',
+        ):
+            self.assertIn(operation, stats.mapped('operation'))
+        report_stat = stats.filtered(lambda stat: stat.operation == 'sale.rental.report.read_group')
+        self.assertEqual((report_stat.call_count, report_stat.record_count), (1, 1))
+        for stat in stats:
+            self.assertLessEqual(stat.duration_p50, stat.duration_p95)
+            self.assertLessEqual(stat.duration_p95, stat.duration_max)
+        self.assertFalse(PerfStat._flush_samples(), "The samples are only flushed once")
+
+        # once the interval passed, the samples are flushed after the commit of the transaction
+        rental_perf_stat._perf_last_flush[self.env.cr.dbname] -= rental_perf_stat.PERF_FLUSH_INTERVAL + 1
+        self.env['sale.rental.report'].read_group([('order_id', '=', order.id)], ['price:sum'], ['product_id'])
+        self.assertTrue(self.env.cr.postcommit.data.get('rental_perf_flush'))
+        self.env.cr.postcommit.clear()
+        self.assertTrue(PerfStat._flush_samples())
+
+        self.env['ir.config_parameter'].sudo().set_param('sale_renting.perf_instrumentation', False)
+        self.assertFalse(PerfStat._is_enabled())
+        self.env['sale.rental.report'].read_group([('order_id', '=', order.id)], ['price:sum'], ['product_id'])
+        self.assertFalse(PerfStat._flush_samples())
+
+    def test_fill_rental_columns(self):
+        delay_product = self.env['product.product'].create({
+            'name': 'Delay',
+            'default_code': 'RENTAL',
+            'list_price': 15.0,
+        })
+        partners = self.env['res.partner'].create([{'name': 'Partner %s' % i, 'risk': 1.0 + i / 10} for i in range(5)])
+        orders = self.env['sale.order'].create([{
+            'partner_id': partner.id,
+            'order_line': [
+                Command.create({'product_id': self.product_id.id, 'price_unit': 40.0}),
+                Command.create({'product_id': delay_product.id}),
+            ] if index % 2 else [],
+        } for index, partner in enumerate(partners * 2)])
+        self.env.flush_all()
+        # the columns of the existing orders, as added by the pre-init hook
+        self.cr.execute(
+            "UPDATE sale_order SET partner_risk = NULL, deposit = NULL, total_deposit = NULL WHERE id IN %s",
+            [tuple(orders.ids)])
+        self.cr.execute("SELECT COUNT(*) FROM sale_order WHERE partner_risk IS NULL OR deposit IS NULL")
+        self.assertEqual(self.cr.fetchone()[0], 10)
+
+        # interrupted after two chunks of 3 rows
+        commits = []
+
+        def commit():
+            commits.append(True)
+            if len(commits) == 2:
+                raise InterruptedError()
+        self.patch(self.cr, 'commit', commit)
+        with self.assertRaises(InterruptedError):
+            _fill_partner_risk(self.cr, chunk_size=3)
+        self.cr.execute("SELECT COUNT(*) FROM sale_order WHERE partner_risk IS NULL")
+        self.assertEqual(self.cr.fetchone()[0], 4)
+
+        # resumed: only the remaining rows are filled
+        commits.clear()
+        self.patch(self.cr, 'commit', lambda: commits.append(True))
+        _fill_partner_risk(self.cr, chunk_size=3)
+        self.assertEqual(len(commits), 2)
+        _fill_deposit(self.cr, chunk_size=4)
+        self.assertEqual(len(commits), 2 + 3)
+        self.cr.execute(
+            "SELECT COUNT(*) FROM sale_order WHERE partner_risk IS NULL OR deposit IS NULL OR total_deposit IS NULL")
+        self.assertEqual(self.cr.fetchone()[0], 0)
+
+        # the filled values are the ones the ORM computes
+        self.cr.execute(
+            "SELECT id, partner_risk, deposit, total_deposit FROM sale_order WHERE id IN %s", [tuple(orders.ids)])
+        filled = {order_id: values for order_id, *values in self.cr.fetchall()}
+        orders.invalidate_recordset()
+        for fname in ('partner_risk', 'deposit'):
+            self.env.add_to_compute(orders._fields[fname], orders)
+        for order in orders:
+            partner_risk, deposit, total_deposit = filled[order.id]
+            self.assertEqual(partner_risk, order.partner_id.risk)
+            self.assertAlmostEqual(float(deposit), order.deposit)
+            self.assertAlmostEqual(float(total_deposit), order.total_deposit)
+        self.assertTrue(any(orders.mapped('deposit')), "Some orders must have delay costs")
+
+    def test_rental_indexes(self):
+        usage = {stat['index']: stat for stat in get_rental_index_usage(self.env.cr)}
+        for index in RENTAL_INDEXES:
+            self.assertIsNotNone(usage[index]['scans'], "The index %s should exist" % index)
+
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        order = self.env['sale.order'].create({
+            'partner_id': self.env['res.partner'].create({'name': 'A partner'}).id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': self.product_id.id,
+                'product_uom_qty': 3,
+                'is_rental': True,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(days=1),
+            })],
+        })
+        order.action_confirm()
+        self.assertEqual(self.product_id.qty_in_rent, 0.0)
+        order.order_line.write({'qty_delivered': 3, 'qty_returned': 1})
+        self.product_id.invalidate_recordset(['qty_in_rent'])
+        self.assertEqual(self.product_id.qty_in_rent, 2.0)
+        self.assertEqual(self.product_template_id.qty_in_rent, 2.0)
+        # the pending updates are flushed before querying the lines
+        order.order_line.qty_returned = 3
+        self.product_id.invalidate_recordset(['qty_in_rent'])
+        self.assertEqual(self.product_id.qty_in_rent, 0.0)
+
+    def test_rental_catalog_search(self):
+        ProductTemplate = self.env['product.template']
+        games = ProductTemplate.create([{
+            'name': 'Catalog Game %s' % name,
+            'rent_ok': True,
+            'players_min': players_min,
+            'players_max': players_max,
+            'time_min': time_min,
+            'time_max': time_max,
+            'age': age,
+            'level': level,
+        } for name, players_min, players_max, time_min, time_max, age, level in (
+            ('Duel', 2, 2, 20, 30, 8, 'entry'),
+            ('Party', 4, 0, 15, 15, 0, 'entry'),
+            ('Epic', 3, 5, 90, 180, 14, 'advanced'),
+            ('Family', 2, 6, 30, 60, 10, 'intermediate'),
+        )])
+        not_rentable = games[3].copy({'name': 'Catalog Game Sold', 'rent_ok': False})
+
+        def search(**criteria):
+            domain = ProductTemplate._get_rental_catalog_domain(**criteria)
+            return ProductTemplate.search(domain + [('id', 'in', (games | not_rentable).ids)]).mapped('name')
+
+        self.assertCountEqual(search(players=4), ['Catalog Game Party', 'Catalog Game Epic', 'Catalog Game Family'])
+        self.assertCountEqual(search(players=8), ['Catalog Game Party'], "An unset maximum is unbounded")
+        self.assertCountEqual(search(playtime=(0, 60)), ['Catalog Game Duel', 'Catalog Game Party', 'Catalog Game Family'])
+        self.assertCountEqual(search(playtime=(45, 120)), ['Catalog Game Epic', 'Catalog Game Family'])
+        self.assertCountEqual(search(playtime=25), ['Catalog Game Duel'])
+        self.assertCountEqual(search(players=4, playtime=(0, 60), age=10), ['Catalog Game Party', 'Catalog Game Family'])
+        self.assertCountEqual(search(level=['entry', 'advanced'], age=12), ['Catalog Game Duel', 'Catalog Game Party'])
+
+        result = ProductTemplate.search_rental_catalog(players=4, limit=1)
+        self.assertEqual(len(result['records']), 1)
+        self.assertGreaterEqual(result['count'], 3)
+
+    def test_pricing_explanation_cache(self):
+        company = self.env.company
+        today = fields.Date.today()
+        currency = self.env['res.currency'].create({'name': 'RNT', 'symbol': 'R', 'rounding': 0.01})
+        rate = self.env['res.currency.rate'].create({
+            'currency_id': currency.id,
+            'company_id': company.id,
+            'name': today,
+            'rate': 2.0,
+        })
+
+        def get_explanation():
+            Wizard = self.env['rental.wizard']
+            currencies_key = Wizard._get_pricing_explanation_currencies_key(currency, company, today)
+            return Wizard._get_pricing_explanation(
+                currencies_key, company.id, today, currency.id, 2, 1, 'day', 10.0,
+                company.currency_id.id, 0.0, 0.0, company.currency_id.id)
+
+        self.assertIn('20.00', get_explanation())
+        rate.rate = 3.0
+        self.assertIn('30.00', get_explanation(), "A new rate of the day should not use the cache")
+        currency.symbol = 'RR'
+        self.assertIn('RR', get_explanation(), "A new currency format should not use the cache")
+
 
 @tagged('post_install', '-at_install')
 class TestUi(HttpCase):
@@ -621,3 +1401,152 @@ class TestUi(HttpCase):
         # create it in advance here instead
         self.env['res.partner'].name_create('Agrolait')
         self.start_tour("/web", 'rental_tour', login="admin")
+
+    def test_rental_pricing_parity(self):
+        """ The configurator prices the rentals client side: run static/src/js/rental_pricing.js
+        on the pricing tables of the server and compare with the server quotes."""
+        company_currency = self.env.company.currency_id
+        other_currency = self.env.ref('base.EUR' if company_currency != self.env.ref('base.EUR') else 'base.USD')
+        other_currency.active = True
+        self.env['res.currency.rate'].create({
+            'currency_id': other_currency.id,
+            'rate': company_currency.rate * 1.333,
+            'name': fields.Date.today(),
+        })
+        recurrences = self.env['sale.temporal.recurrence'].create([
+            {'duration': 1, 'unit': 'hour'},
+            {'duration': 1, 'unit': 'day'},
+            {'duration': 1, 'unit': 'month'},
+        ])
+        pricelist = self.env['product.pricelist'].create({'name': 'Rental Pricelist'})
+        other_pricelist = self.env['product.pricelist'].create({
+            'name': 'Foreign Rental Pricelist',
+            'currency_id': other_currency.id,
+        })
+        product, product_without_pricing = self.env['product.product'].create([{
+            'name': name,
+            'rent_ok': True,
+            'type': 'consu',
+            'list_price': 100.0,
+        } for name in ('Projector', 'Screen')])
+        # 3.50 per hour, 80.00 per day and 300.00 per month, the daily price being
+        # cheaper once converted than the one of the foreign pricelist
+        self.env['product.pricing'].create([{
+            'product_template_id': product.product_tmpl_id.id,
+            'recurrence_id': recurrence.id,
+            'price_percent': price_percent,
+        } for recurrence, price_percent in zip(recurrences, (3.5, 80.0, 300.0))] + [{
+            'product_template_id': product.product_tmpl_id.id,
+            'recurrence_id': recurrences[1].id,
+            'pricelist_id': other_pricelist.id,
+            'price_percent': 110.0,
+        }])
+
+        periods = [
+            (datetime(2023, 6, 1, 8), datetime(2023, 6, 1, 9)),
+            (datetime(2023, 6, 1, 8), datetime(2023, 6, 2, 4, 30)),
+            (datetime(2023, 6, 1, 8), datetime(2023, 6, 4, 8)),
+            # month ends, relativedelta against the diff of luxon
+            (datetime(2023, 1, 31, 10), datetime(2023, 2, 28, 10)),
+            (datetime(2023, 1, 31, 10), datetime(2023, 3, 1, 10)),
+            (datetime(2024, 1, 31, 10), datetime(2024, 2, 29, 10)),
+            (datetime(2023, 3, 31, 10), datetime(2023, 4, 30, 11)),
+        ]
+        Wizard = self.env['rental.wizard']
+        cases = []
+        for rented_product in product | product_without_pricing:
+            for pricelist_id in (False, pricelist.id, other_pricelist.id):
+                table = Wizard.get_rental_pricing_table(rented_product.id, pricelist_id=pricelist_id)
+                for pickup_date, return_date in periods:
+                    quote = Wizard.get_rental_quote(
+                        rented_product.id, pickup_date, return_date, pricelist_id=pricelist_id)
+                    cases.append({
+                        'table': table,
+                        'pickup_date': fields.Datetime.to_string(pickup_date),
+                        'return_date': fields.Datetime.to_string(return_date),
+                        'quote': [quote['pricing_id'], quote['duration'], quote['duration_unit'], quote['unit_price']],
+                    })
+        self.assertTrue(any(
+            pricing['currency_id'] != case['table']['currency_id']
+            for case in cases for pricing in case['table']['pricings']
+        ), "Some pricings must be converted")
+
+        code = """
+            const { computeRentalQuote } = odoo.__DEBUG__.services["@sale_renting/js/rental_pricing"];
+            const { DateTime } = luxon;
+            const errors = [];
+            for (const testCase of %s) {
+                const quote = computeRentalQuote(
+                    testCase.table,
+                    DateTime.fromSQL(testCase.pickup_date, { zone: "utc" }),
+                    DateTime.fromSQL(testCase.return_date, { zone: "utc" })
+                );
+                const [pricingId, duration, durationUnit, unitPrice] = testCase.quote;
+                if (
+                    quote.pricingId !== pricingId ||
+                    quote.duration !== duration ||
+                    quote.durationUnit !== durationUnit ||
+                    Math.abs(quote.unitPrice - unitPrice) > 1e-6
+                ) {
+                    errors.push(`${testCase.pickup_date} - ${testCase.return_date}: ${JSON.stringify(quote)} ` +
+                                `instead of ${JSON.stringify(testCase.quote)}`);
+                }
+            }
+            if (errors.length) {
+                console.error("Rental pricing mismatch:\\n" + errors.join("\\n"));
+            } else {
+                console.log("test successful");
+            }
+        """ % json.dumps(cases)
+        self.browser_js("/web", code, ready="odoo.isReady", login="admin")
+
+    def test_rental_pricing_qunit(self):
+        self.browser_js("/web/tests?filter=rental_pricing", "", "", login="admin", timeout=300)
+
+    def test_register_defects_route(self):
+        template = self.env['product.template'].create({'name': 'Carcassonne', 'rent_ok': True, 'list_price': 100.0})
+        meeple = self.env['product.piece'].create({
+            'product_template_id': template.id,
+            'name': 'Meeple',
+            'qty': 10,
+            'group_value': 10.0,
+        })
+        pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        order = self.env['sale.order'].create({
+            'partner_id': self.env['res.partner'].create({'name': 'A partner'}).id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': template.product_variant_id.id,
+                'is_rental': True,
+                'start_date': pickup_date,
+                'return_date': pickup_date + relativedelta(days=1),
+            })],
+        })
+        self.authenticate('admin', 'admin')
+
+        def register_defects(**params):
+            response = self.url_open(
+                '/sale_renting/register_defects',
+                data=json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params}),
+                headers={'Content-Type': 'application/json'},
+            )
+            return response.json()
+
+        result = register_defects(order_id=order.id, defects=[
+            {'order_line_id': order.order_line.id, 'product_piece_id': meeple.id, 'qty': 2},
+        ])['result']
+        self.assertEqual(result['defect_ids'], order.order_line.defects.ids)
+        self.assertEqual(result['deposit'], 50.0 - 2)
+
+        for params in (
+            {'order_id': order.id, 'defects': {'order_line_id': order.order_line.id}},
+            {'order_id': str(order.id), 'defects': []},
+            {'order_id': order.id + 1000, 'defects': []},
+            {'order_id': order.id, 'defects': [{'product_piece_id': meeple.id, 'qty': 1}]},
+            {'order_id': order.id, 'defects': [
+                {'order_line_id': order.order_line.id, 'product_piece_id': [meeple.id], 'qty': 1},
+            ]},
+        ):
+            error = register_defects(**params)['error']
+            self.assertEqual(error['data']['name'], 'odoo.exceptions.UserError', params)
+        self.assertEqual(len(order.order_line.defects), 1)
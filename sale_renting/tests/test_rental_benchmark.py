@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import Command, fields, release
+from odoo.tests import Form, tagged, TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+# Scales (number of templates) of the benchmark, e.g. RENTAL_BENCHMARK_SCALES=10,100,1000
+BENCHMARK_SCALES = [int(scale) for scale in os.environ.get('RENTAL_BENCHMARK_SCALES', '10,100').split(',')]
+# Path of the JSON report, to diff the results between versions
+BENCHMARK_REPORT = os.environ.get('RENTAL_BENCHMARK_REPORT')
+# Number of rentals driven through the whole rental flow
+BENCHMARK_FLOW_ORDERS = int(os.environ.get('RENTAL_BENCHMARK_FLOW_ORDERS', '100'))
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of the given values."""
+    values = sorted(values)
+    return values[max(0, -(-len(values) * percent // 100) - 1)]
+
+
+class RentalBenchmarkCase(TransactionCase):
+    """Measure the wall time, SQL queries and memory allocations of rental operations.
+
+    The benchmarks are not run with the standard tests: run them with
+    `--test-tags rental_benchmark`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.benchmark_results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        report = {
+            'version': release.version,
+            'database': cls.env.cr.dbname,
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'results': cls.benchmark_results,
+        }
+        if BENCHMARK_REPORT:
+            path = '%s.%s.json' % (os.path.splitext(BENCHMARK_REPORT)[0], cls.__name__)
+            with open(path, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+            _logger.info("Rental benchmark report written in %s", path)
+        for result in cls.benchmark_results:
+            _logger.info("Rental benchmark: %s", result)
+        super().tearDownClass()
+
+    def benchmark(self, name, scale, func, records=1):
+        """Run `func` with cold caches and record its measures.
+
+        :param str name: name of the measured operation
+        :param int scale: scale of the dataset
+        :param func: function to measure
+        :param int records: number of records processed by `func`
+        :return: the result of `func`
+        """
+        self.env.flush_all()
+        self.env.invalidate_all()
+        tracemalloc.start()
+        queries = self.cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            result = func()
+            self.env.flush_all()
+        finally:
+            wall_time = time.perf_counter() - start
+            queries = self.cr.sql_log_count - queries
+            __, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.benchmark_results.append({
+            'operation': name,
+            'scale': scale,
+            'records': records,
+            'wall_time': round(wall_time, 6),
+            'queries': queries,
+            'peak_memory': peak_memory,
+        })
+        return result
+
+    @contextmanager
+    def rollback(self):
+        """Roll back the data created in the block, e.g. to measure each scale on its own
+        dataset rather than on the data of all the previous scales."""
+        self.env.flush_all()
+        savepoint = self.cr.savepoint(flush=False)
+        try:
+            yield
+        finally:
+            savepoint.close(rollback=True)
+            self.env.invalidate_all(flush=False)
+
+
+@tagged('post_install', '-at_install', '-standard', 'rental_benchmark')
+class TestRentalPricingBenchmark(RentalBenchmarkCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Recurrence = cls.env['sale.temporal.recurrence']
+        cls.recurrences = Recurrence.create([
+            {'duration': duration, 'unit': unit}
+            for duration, unit in ((1, 'hour'), (3, 'hour'), (1, 'day'), (1, 'week'), (1, 'month'))
+        ])
+        cls.pricelists = cls.env['product.pricelist'].create([
+            {'name': 'Benchmark Pricelist %s' % i} for i in range(3)
+        ])
+        cls.pickup_date = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) + relativedelta(days=1)
+        cls.periods = [relativedelta(hours=5), relativedelta(days=2, hours=3), relativedelta(weeks=2, days=1)]
+
+    def _seed_products(self, scale):
+        templates = self.env['product.template'].create([{
+            'name': 'Benchmark Game %s' % i,
+            'rent_ok': True,
+            'list_price': 20.0 + i,
+        } for i in range(scale)])
+        grid = {recurrence.id: 5.0 * (i + 1) for i, recurrence in enumerate(self.recurrences)}
+        self.env['product.pricing']._apply_pricing_grid(templates, grid)
+        for pricelist in self.pricelists:
+            self.env['product.pricing']._apply_pricing_grid(templates, grid, pricelist=pricelist)
+        return templates.product_variant_ids
+
+    def test_pricing_benchmark(self):
+        for scale in BENCHMARK_SCALES:
+            with self.rollback():
+                self._benchmark_pricing(scale)
+
+    def _benchmark_pricing(self, scale):
+        Pricing = self.env['product.pricing']
+        products = self._seed_products(scale)
+        pricelist = self.pricelists[0]
+        dates = [(self.pickup_date, self.pickup_date + period) for period in self.periods]
+
+        self.benchmark('_compute_duration_vals', scale, lambda: [
+            Pricing._compute_duration_vals(start, end) for __ in range(scale) for start, end in dates
+        ], records=scale * len(dates))
+
+        self.benchmark('_get_best_pricing_rule', scale, lambda: [
+            product._get_best_pricing_rule(
+                start_date=start, end_date=end, pricelist=pricelist, currency=pricelist.currency_id)
+            for product in products for start, end in dates
+        ], records=len(products) * len(dates))
+
+        self.benchmark('_compute_price_rule', scale, lambda: [
+            pricelist._compute_price_rule(products, 1.0, start_date=start, end_date=end)
+            for start, end in dates
+        ], records=len(products) * len(dates))
+
+        self.benchmark('rental.wizard.get_rental_quote', scale, lambda: [
+            self.env['rental.wizard'].get_rental_quote(product.id, start, end, pricelist_id=pricelist.id)
+            for product in products[:50] for start, end in dates
+        ], records=len(products[:50]) * len(dates))
+
+        self.benchmark('rental.wizard.onchange', scale, lambda: [
+            self._configure_rental(product, pricelist, dates)
+            for product in products[:50]
+        ], records=len(products[:50]) * len(dates))
+
+    def _configure_rental(self, product, pricelist, dates):
+        """Open the rental configurator on a product and go through the given periods, like
+        a user picking dates: each change runs the onchanges of the configurator form."""
+        start, end = dates[0]
+        configurator = Form(self.env['rental.wizard'].with_context(
+            default_product_id=product.id,
+            default_pricelist_id=pricelist.id,
+            default_pickup_date=fields.Datetime.to_string(start),
+            default_return_date=fields.Datetime.to_string(end),
+        ))
+        for start, end in dates[1:]:
+            configurator.pickup_date = start
+            configurator.return_date = end
+        return configurator.unit_price
+
+
+@tagged('post_install', '-at_install', '-standard', 'rental_benchmark')
+class TestRentalFlowBenchmark(RentalBenchmarkCase):
+    """Drive rentals through the quote, confirm, pickup and return steps of the rental
+    flow, one order at a time like a user would, and report the latency percentiles and
+    queries of each step, and the throughput of the whole flow.
+
+    The whole flow runs in the transaction of the test: the steps are flushed but never
+    committed, so the commits of the requests of a real flow (and the waits on the locks
+    held by concurrent requests) are not part of the measures.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.recurrence_daily = cls.env['sale.temporal.recurrence'].create({'duration': 1, 'unit': 'day'})
+        cls.products = cls.env['product.product'].create([{
+            'name': 'Benchmark Game %s' % i,
+            'rent_ok': True,
+            'type': 'consu',
+            'list_price': 40.0,
+            'extra_hourly_percent': 5.0,
+            'extra_daily_percent': 20.0,
+            'pieces': [Command.create({'name': 'Meeple', 'qty': 10, 'group_value': 10.0})],
+        } for i in range(10)])
+        cls.env['product.pricing']._apply_pricing_grid(
+            cls.products.product_tmpl_id, {cls.recurrence_daily.id: 25.0})
+        cls.partners = cls.env['res.partner'].create([{'name': 'Benchmark Customer %s' % i} for i in range(10)])
+
+    def _measure(self, measures, stage, func):
+        queries = self.cr.sql_log_count
+        start = time.perf_counter()
+        result = func()
+        self.env.flush_all()
+        measures[stage].append((time.perf_counter() - start, self.cr.sql_log_count - queries))
+        return result
+
+    def _quote(self, index):
+        now = fields.Datetime.now().replace(minute=0, second=0, microsecond=0)
+        # one rental out of four is returned late
+        pickup_date = now - relativedelta(days=3) if index % 4 == 0 else now + relativedelta(hours=1)
+        return_date = now - relativedelta(days=1) if index % 4 == 0 else now + relativedelta(days=2)
+        products = self.products[index % 10] | self.products[(index + 1) % 10]
+        order = self.env['sale.order'].create({
+            'partner_id': self.partners[index % 10].id,
+            'is_rental_order': True,
+        })
+        order.write({'order_line': [Command.create({
+            'product_id': product.id,
+            'is_rental': True,
+            'start_date': pickup_date,
+            'return_date': return_date,
+            'price_unit': self.env['rental.wizard'].get_rental_quote(
+                product.id, pickup_date, return_date, pricelist_id=order.pricelist_id.id)['unit_price'],
+        }) for product in products]})
+        return order
+
+    def _process(self, action):
+        wizard = Form(self.env['rental.order.wizard'].with_context(action['context'])).save()
+        wizard.apply()
+
+    def _return(self, order, index):
+        if index % 3 == 0:
+            line = order.order_line[0]
+            order._register_defects([{
+                'order_line_id': line.id,
+                'product_piece_id': line.product_template_id.pieces[0].id,
+                'qty': 1,
+            }])
+        self._process(order.open_return())
+
+    def test_rental_flow_benchmark(self):
+        stages = ('quote', 'confirm', 'pickup', 'return')
+        measures = {stage: [] for stage in stages}
+        start = time.perf_counter()
+        for index in range(BENCHMARK_FLOW_ORDERS):
+            order = self._measure(measures, 'quote', lambda: self._quote(index))
+            self._measure(measures, 'confirm', order.action_confirm_wizard)
+            self._measure(measures, 'pickup', lambda: self._process(order.open_pickup()))
+            self._measure(measures, 'return', lambda: self._return(order, index))
+            self.assertEqual(order.rental_status, 'returned')
+        wall_time = time.perf_counter() - start
+
+        for stage in stages:
+            durations = [duration for duration, __ in measures[stage]]
+            queries = [query_count for __, query_count in measures[stage]]
+            self.benchmark_results.append({
+                'operation': 'flow.%s' % stage,
+                'scale': BENCHMARK_FLOW_ORDERS,
+                'records': len(durations),
+                'p50': round(percentile(durations, 50), 6),
+                'p95': round(percentile(durations, 95), 6),
+                'p99': round(percentile(durations, 99), 6),
+                'max': round(max(durations), 6),
+                'queries_p50': percentile(queries, 50),
+                'queries_max': max(queries),
+            })
+        self.benchmark_results.append({
+            'operation': 'flow',
+            'scale': BENCHMARK_FLOW_ORDERS,
+            'records': BENCHMARK_FLOW_ORDERS,
+            'wall_time': round(wall_time, 6),
+            'rentals_per_minute': round(BENCHMARK_FLOW_ORDERS * 60 / wall_time, 1),
+        })
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import Command, fields
+from odoo.tests import Form, tagged, TransactionCase
+
+# Extra queries tolerated when processing 100 records instead of 1: prefetching and
+# flushing larger batches may cost a few more queries, but never one per record.
+QUERY_SLACK = 10
+
+
+@tagged('post_install', '-at_install')
+class TestRentalQueryCount(TransactionCase):
+    """Guard the rental hot paths against N+1 queries.
+
+    Each operation is run on 1 and on 100 records (order lines or products) and the
+    number of queries of the second run may not exceed the first one by more than
+    QUERY_SLACK, nor the absolute bound of the operation.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.recurrence_daily = cls.env['sale.temporal.recurrence'].create({'duration': 1, 'unit': 'day'})
+        cls.products = cls.env['product.product'].create([{
+            'name': 'Query Count Game %s' % i,
+            'rent_ok': True,
+            'type': 'consu',
+            'list_price': 40.0,
+        } for i in range(100)])
+        for template in cls.products.product_tmpl_id:
+            template.rent_product = template
+        cls.env['product.pricing']._apply_pricing_grid(
+            cls.products.product_tmpl_id, {cls.recurrence_daily.id: 25.0})
+        cls.partner = cls.env['res.partner'].create({'name': 'Query Count Customer'})
+        now = fields.Datetime.now().replace(minute=0, second=0, microsecond=0)
+        cls.start_date = now + relativedelta(hours=1)
+        cls.return_date = now + relativedelta(days=2)
+
+    def _create_order(self, count, confirm=False):
+        order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'is_rental_order': True,
+            'order_line': [Command.create({
+                'product_id': product.id,
+                'is_rental': True,
+                'start_date': self.start_date,
+                'return_date': self.return_date,
+                'price_unit': 10.0,
+            }) for product in self.products[:count]],
+        })
+        if confirm:
+            order.action_confirm()
+        return order
+
+    def _process(self, action):
+        wizard = Form(self.env['rental.order.wizard'].with_context(action['context'])).save()
+        self.assertEqual(len(wizard.rental_wizard_line_ids), len(wizard.order_id.order_line))
+        return wizard
+
+    def assertQueryCountScales(self, operation, max_queries, slack=QUERY_SLACK):
+        """Check that the number of queries of an operation does not grow with its records.
+
+        :param operation: function preparing the data for the given number of records and
+            returning the function to measure. It is called a first time to warm up the caches.
+        :param int max_queries: queries allowed for 100 records, whatever the single record
+            run costs
+        :param int slack: extra queries tolerated for 100 records
+        """
+        query_counts = []
+        for count in (1, 1, 100):
+            func = operation(count)
+            self.env.flush_all()
+            self.env.invalidate_all()
+            queries = self.cr.sql_log_count
+            if count == 100:
+                with self.assertQueryCount(max_queries):
+                    func()
+            else:
+                func()
+            self.env.flush_all()
+            query_counts.append(self.cr.sql_log_count - queries)
+        __, single, batch = query_counts
+        self.assertLessEqual(
+            batch, single + slack,
+            "%s queries for 100 records against %s for a single one" % (batch, single))
+
+    def test_query_count_confirm(self):
+        self.assertQueryCountScales(lambda count: self._create_order(count).action_confirm, 80)
+
+    def test_query_count_pickup(self):
+        def operation(count):
+            order = self._create_order(count, confirm=True)
+            return self._process(order.open_pickup()).apply
+        self.assertQueryCountScales(operation, 90)
+
+    def test_query_count_return(self):
+        def operation(count):
+            order = self._create_order(count, confirm=True)
+            self._process(order.open_pickup()).apply()
+            return self._process(order.open_return()).apply
+        self.assertQueryCountScales(operation, 100)
+
+    def test_query_count_deposit(self):
+        def operation(count):
+            order = self._create_order(count, confirm=True)
+
+            def recompute_deposit():
+                self.env.add_to_compute(order.order_line._fields['deposit'], order.order_line)
+                self.env.add_to_compute(order._fields['deposit'], order)
+                self.assertTrue(order.deposit)
+            return recompute_deposit
+        self.assertQueryCountScales(operation, 15)
+
+    def test_query_count_discount(self):
+        def operation(count):
+            self._create_order(count, confirm=True)
+            order = self._create_order(count)
+            return order.order_line._set_disctount
+        self.assertQueryCountScales(operation, 25)
+
+    def test_query_count_qty_in_rent(self):
+        def operation(count):
+            self._create_order(count, confirm=True)
+            templates = self.products[:count].product_tmpl_id
+            return lambda: templates.mapped('qty_in_rent')
+        self.assertQueryCountScales(operation, 8)
+
+    def test_query_count_gantt_read(self):
+        def operation(count):
+            order = self._create_order(count, confirm=True)
+            domain = [('order_id', '=', order.id)]
+
+            def gantt_read():
+                Schedule = self.env['sale.rental.schedule']
+                Schedule.read_group(domain, ['product_uom_qty:sum'], ['product_id'])
+                records = Schedule.search_read(
+                    domain, ['card_name', 'product_id', 'pickup_date', 'return_date', 'report_line_status', 'color'])
+                self.assertEqual(len(records), count)
+            return gantt_read
+        self.assertQueryCountScales(operation, 20)
+
+    def test_query_count_report_read(self):
+        def operation(count):
+            order = self._create_order(count, confirm=True)
+            domain = [('order_id', '=', order.id)]
+
+            def report_read():
+                Report = self.env['sale.rental.report']
+                Report.read_group(domain, ['quantity:sum', 'price:sum'], ['product_id'])
+                Report.search_read(domain, ['date', 'product_id', 'quantity', 'price'])
+            return report_read
+        self.assertQueryCountScales(operation, 15)
@@ -2,7 +2,8 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 from dateutil.relativedelta import relativedelta
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import ValidationError
 import math
 
 class RentalWizard(models.TransientModel):
@@ -151,45 +152,29 @@ class RentalWizard(models.TransientModel):
 
     @api.depends('unit_price', 'pricing_id')
     def _compute_pricing_explanation(self):
-        translated_pricing_duration_unit = dict()
-        for key, value in self.pricing_id.recurrence_id._fields['unit']._description_selection(self.env):
-            translated_pricing_duration_unit[key] = value
+        today = fields.Date.today()
+        currencies_key = self._get_pricing_explanation_currencies_key(
+            self.currency_id | self.pricing_id.currency_id | self.product_id.currency_id,
+            self.env.company,
+            today,
+        )
         for wizard in self:
             if wizard.pricing_id and wizard.duration > 0 and wizard.unit_price != 0.0:
-                if wizard.pricing_id.recurrence_id.duration > 0:
-                    pricing_explanation = "%i * %i %s (%s)" % (
-                        math.ceil(wizard.duration / wizard.pricing_id.recurrence_id.duration),
-                        wizard.pricing_id.recurrence_id.duration,
-                        translated_pricing_duration_unit[wizard.pricing_id.recurrence_id.unit],
-                        self.env['ir.qweb.field.monetary'].value_to_html(
-                            wizard.pricing_id.price, {
-                                'from_currency': wizard.pricing_id.currency_id,
-                                'display_currency': wizard.currency_id,
-                                'company_id': self.env.company.id,
-                            }))
-                else:
-                    pricing_explanation = _("Fixed rental price")
-                if wizard.product_id.extra_hourly or wizard.product_id.extra_daily:
-                    pricing_explanation += "<br/>%s" % (_("Extras:"))
-                if wizard.product_id.extra_hourly:
-                    pricing_explanation += " %s%s" % (
-                        self.env['ir.qweb.field.monetary'].value_to_html(
-                            wizard.product_id.extra_hourly, {
-                                'from_currency': wizard.product_id.currency_id,
-                                'display_currency': wizard.currency_id,
-                                'company_id': self.env.company.id,
-                            }),
-                        _("/hour"))
-                if wizard.product_id.extra_daily:
-                    pricing_explanation += " %s%s" % (
-                        self.env['ir.qweb.field.monetary'].value_to_html(
-                            wizard.product_id.extra_daily, {
-                                'from_currency': wizard.product_id.currency_id,
-                                'display_currency': wizard.currency_id,
-                                'company_id': self.env.company.id,
-                            }),
-                        _("/day"))
-                wizard.pricing_explanation = pricing_explanation
+                recurrence = wizard.pricing_id.recurrence_id
+                wizard.pricing_explanation = self._get_pricing_explanation(
+                    currencies_key,
+                    self.env.company.id,
+                    today,
+                    wizard.currency_id.id,
+                    math.ceil(wizard.duration / recurrence.duration) if recurrence.duration > 0 else 0,
+                    recurrence.duration,
+                    recurrence.unit,
+                    wizard.pricing_id.price,
+                    wizard.pricing_id.currency_id.id,
+                    wizard.product_id.extra_hourly,
+                    wizard.product_id.extra_daily,
+                    wizard.product_id.currency_id.id,
+                )
             else:
                 # if no pricing on product: explain only sales price is applied ?
                 if not wizard.product_id.product_pricing_ids and wizard.duration:
@@ -197,6 +182,164 @@ class RentalWizard(models.TransientModel):
                 else:
                     wizard.pricing_explanation = ""
 
+    @api.model
+    def _get_pricing_explanation_currencies_key(self, currencies, company, date):
+        """Return the formats and the rates of the given currencies, as part of the cache key
+        of _get_pricing_explanation.
+
+        :param currencies: currencies of the amounts of the explanations
+        :param company: company used for the currency conversions
+        :param date date: date of the currency conversions
+        :rtype: tuple
+        """
+        currencies |= company.currency_id
+        rates = currencies._get_rates(company, date)
+        return tuple(
+            (currency.id, currency.symbol, currency.position, currency.rounding, rates.get(currency.id))
+            for currency in currencies.sorted('id')
+        )
+
+    @api.model
+    @tools.ormcache(
+        'self.env.lang', 'currencies_key', 'company_id', 'date', 'currency_id', 'periods',
+        'duration', 'unit', 'price', 'price_currency_id', 'extra_hourly', 'extra_daily',
+        'extra_currency_id',
+    )
+    def _get_pricing_explanation(
+        self, currencies_key, company_id, date, currency_id, periods, duration, unit, price,
+        price_currency_id, extra_hourly, extra_daily, extra_currency_id
+    ):
+        """Render the pricing explanation of the configurator.
+
+        The explanation is cached on the values it is rendered from, so that changing the
+        dates in the configurator does not render the monetary widgets again.
+
+        :param tuple currencies_key: formats and rates of the currencies, only used as cache
+            key, see _get_pricing_explanation_currencies_key
+        :param int company_id: company used for the currency conversions
+        :param date date: date of the currency conversions
+        :param int currency_id: currency the amounts are displayed in
+        :param int periods: number of pricing periods covered by the rental
+        :param int duration: duration of the pricing period
+        :param str unit: unit of the pricing period
+        :param float price: price of a pricing period
+        :param int price_currency_id: currency of the pricing
+        :param float extra_hourly: hourly delay cost of the product
+        :param float extra_daily: daily delay cost of the product
+        :param int extra_currency_id: currency of the product
+        :rtype: str
+        """
+        Currency = self.env['res.currency']
+        Monetary = self.env['ir.qweb.field.monetary']
+
+        def format_amount(amount, from_currency_id):
+            return Monetary.value_to_html(amount, {
+                'from_currency': Currency.browse(from_currency_id),
+                'display_currency': Currency.browse(currency_id),
+                'company_id': company_id,
+                'date': date,
+            })
+
+        if duration > 0:
+            translated_units = dict(
+                self.env['sale.temporal.recurrence']._fields['unit']._description_selection(self.env))
+            pricing_explanation = "%i * %i %s (%s)" % (
+                periods, duration, translated_units[unit], format_amount(price, price_currency_id))
+        else:
+            pricing_explanation = _("Fixed rental price")
+        if extra_hourly or extra_daily:
+            pricing_explanation += "<br/>%s" % (_("Extras:"))
+        if extra_hourly:
+            pricing_explanation += " %s%s" % (format_amount(extra_hourly, extra_currency_id), _("/hour"))
+        if extra_daily:
+            pricing_explanation += " %s%s" % (format_amount(extra_daily, extra_currency_id), _("/day"))
+        return pricing_explanation
+
+    @api.model
+    def get_rental_quote(self, product_id, pickup_date, return_date, quantity=1.0, pricelist_id=False,
+                         tax_ids=None, company_id=False):
+        """Price a rental the same way the configurator does, without storing anything.
+
+        :param int product_id: rented product
+        :param pickup_date: pickup date (datetime or string)
+        :param return_date: return date (datetime or string)
+        :param float quantity: rented quantity
+        :param int pricelist_id: pricelist of the order, if any
+        :param list tax_ids: taxes of the order line after fiscal position mapping, if any
+        :param int company_id: company of the order, if any
+        :return: the best pricing rule, the duration and the unit price of the rental
+        :rtype: dict
+        """
+        pickup_date = fields.Datetime.to_datetime(pickup_date)
+        return_date = fields.Datetime.to_datetime(return_date)
+        if not pickup_date or not return_date or pickup_date >= return_date:
+            raise ValidationError(_("Please choose a return date that is after the pickup date."))
+        Wizard = self
+        if company_id:
+            Wizard = Wizard.with_company(company_id)
+        if tax_ids is not None:
+            Wizard = Wizard.with_context(sale_order_line_tax_ids=tax_ids)
+        wizard = Wizard.new({
+            'product_id': product_id,
+            'pickup_date': pickup_date,
+            'return_date': return_date,
+            'quantity': quantity,
+            'pricelist_id': pricelist_id,
+            'company_id': Wizard.env.company.id,
+        })
+        wizard._compute_unit_price()
+        return {
+            'pricing_id': wizard.pricing_id.id,
+            'duration': wizard.duration,
+            'duration_unit': wizard.duration_unit,
+            'unit_price': wizard.unit_price,
+            'currency_id': wizard.currency_id.id,
+            'pricing_explanation': wizard.pricing_explanation,
+        }
+
+    @api.model
+    def get_rental_pricing_table(self, product_id, pricelist_id=False, tax_ids=None, company_id=False):
+        """Get what the configurator needs to price a rental period client side.
+
+        The configurator applies the same cheapest pricing and ceiling logic as
+        `_compute_pricing`, `_compute_duration` and `_compute_unit_price`
+        (see static/src/js/rental_pricing.js) for instant feedback, the price being
+        confirmed by `get_rental_quote` on save.
+
+        :param int product_id: rented product
+        :param int pricelist_id: pricelist of the order, if any
+        :param list tax_ids: taxes of the order line after fiscal position mapping, if any
+        :param int company_id: company of the order, if any
+        :return: the applicable pricings, with their rate to the configurator currency
+        :rtype: dict
+        """
+        Wizard = self.with_company(company_id) if company_id else self
+        company = Wizard.env.company
+        product = self.env['product.product'].browse(product_id)
+        pricelist = self.env['product.pricelist'].browse(pricelist_id)
+        currency = pricelist.currency_id or company.currency_id
+        today = fields.Date.today()
+        product_taxes = product.taxes_id.filtered(lambda tax: tax.company_id == company)
+        pricings = self.env['product.pricing']._get_suitable_pricings(product, pricelist=pricelist)
+        return {
+            'currency_id': currency.id,
+            'rounding': currency.rounding,
+            'has_pricelist': bool(pricelist),
+            'list_price': product.list_price,
+            'lst_price': product.lst_price,
+            # the unit price cannot be computed client side when the taxes are mapped
+            'local_price': tax_ids is None or set(tax_ids) == set(product_taxes.ids),
+            'pricings': [{
+                'id': pricing.id,
+                'duration': pricing.recurrence_id.duration,
+                'unit': pricing.recurrence_id.unit,
+                'price': pricing.price,
+                'currency_id': pricing.currency_id.id,
+                'rate': self.env['res.currency']._get_conversion_rate(
+                    pricing.currency_id, currency, company, today),
+            } for pricing in pricings],
+        }
+
     _sql_constraints = [
         ('rental_period_coherence',
             "CHECK(pickup_date < return_date)",
@@ -9,16 +9,25 @@ class RentalDefect(models.TransientModel):
     _description = 'Pick-up/Return products'
 
     order_id = fields.Many2one('sale.order', required=True, ondelete='cascade')
-    order_line_id = fields.Many2one('sale.order.line', required=True, domain="[('order_id', '=', order_id)]", string="Product")
-    product_template_id = fields.Many2one('product.template', required=True, related="order_line_id.product_template_id")
-    product_piece_id = fields.Many2one('product.piece', required=True, string="Piece", domain="[('product_template_id', '=', product_template_id)]")
-    qty = fields.Integer(string='Quantity', required=True)
+    defect_line_ids = fields.One2many('rental.order.defect.wizard.line', 'wizard_id', string="Defects")
 
     def apply(self):
-        """Apply the wizard modifications to the SaleOrderLine(s)."""
-        self.env['product.piece.defect'].create({
-            'order_line_id': self.order_line_id.id,
-            'product_piece_id': self.product_piece_id.id,
-            'qty': self.qty
-        })
-        return {'type': 'ir.actions.act_window_close'}
\ No newline at end of file
+        """Register all the defects of the wizard at once."""
+        self.order_id._register_defects([{
+            'order_line_id': line.order_line_id.id,
+            'product_piece_id': line.product_piece_id.id,
+            'qty': line.qty,
+        } for line in self.defect_line_ids])
+        return {'type': 'ir.actions.act_window_close'}
+
+
+class RentalDefectLine(models.TransientModel):
+    _name = 'rental.order.defect.wizard.line'
+    _description = 'Defect to register on a rental order'
+
+    wizard_id = fields.Many2one('rental.order.defect.wizard', required=True, ondelete='cascade')
+    order_id = fields.Many2one(related='wizard_id.order_id')
+    order_line_id = fields.Many2one('sale.order.line', required=True, domain="[('order_id', '=', order_id)]", string="Product")
+    product_template_id = fields.Many2one('product.template', related="order_line_id.product_template_id")
+    product_piece_id = fields.Many2one('product.piece', required=True, string="Piece", domain="[('product_template_id', '=', product_template_id)]")
+    qty = fields.Integer(string='Quantity', required=True, default=1)
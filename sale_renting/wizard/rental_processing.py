@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from collections import defaultdict
+
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
+from odoo.tools import groupby
+
+from odoo.addons.sale_renting.models.rental_perf_stat import rental_perf
 
 
 class RentalProcessing(models.TransientModel):
@@ -39,31 +44,21 @@ class RentalProcessing(models.TransientModel):
         for wizard in self:
             wizard.has_late_lines = wizard.rental_wizard_line_ids and any(line.is_late for line in wizard.rental_wizard_line_ids)
 
+    @rental_perf('rental.order.wizard.apply')
     def apply(self):
         """Apply the wizard modifications to the SaleOrderLine(s).
 
         And logs the rental infos in the SaleOrder chatter
         """
+        risk_events = self.filtered(
+            lambda wizard: wizard.status == 'pickup' or wizard.order_id.rental_status == 'return')
+        for event_type, wizards in groupby(risk_events, key=lambda wizard: wizard._get_risk_event_type()):
+            self.env['rental.risk.event']._record_order_events(
+                self.browse([wizard.id for wizard in wizards]).order_id, event_type)
+
+        # Log the messages of all the orders at once rather than posting them one by one
+        bodies = defaultdict(str)
         for wizard in self:
-            if wizard.order_id.rental_status == 'return':
-                defects = False
-                risk = wizard.order_id.partner_id.risk
-
-                for line in wizard.order_id.order_line:
-                    if line.defects > 0 or line.product_template_id.default_code == 'RENTAL':
-                        defects = True
-
-                if defects:
-                    risk += 0.25
-                    if risk > 2:
-                        risk = 2
-                else:
-                    risk /= 1.25
-                    if risk < 0.1:
-                        risk = 0.1
-
-                wizard.order_id.partner_id.risk = risk
-
             msg = wizard.rental_wizard_line_ids._apply()
             if msg:
                 for key, value in wizard._fields['status']._description_selection(wizard.env):
@@ -72,10 +67,24 @@ class RentalProcessing(models.TransientModel):
                         break
 
                 header = "<b>" + translated_status + "</b>:<ul>"
-                msg = header + msg + "</ul>"
-                wizard.order_id.message_post(body=msg)
+                bodies[wizard.order_id.id] += header + msg + "</ul>"
+        if bodies:
+            self.env['sale.order'].browse(bodies)._message_log_batch(bodies=bodies)
         return  # {'type': 'ir.actions.act_window_close'}
 
+    def _get_risk_event_type(self):
+        """Get the event of the customer risk recorded when applying the wizard."""
+        self.ensure_one()
+        if self.status == 'pickup':
+            return 'pickup'
+        order_lines = self.order_id.order_line
+        if order_lines.defects:
+            return 'defect'
+        if any(line.product_template_id.default_code == 'RENTAL' for line in order_lines)\
+           or any(self.rental_wizard_line_ids.mapped('is_late')):
+            return 'late'
+        return 'return'
+
 
 class RentalProcessingLine(models.TransientModel):
     _name = 'rental.order.wizard.line'
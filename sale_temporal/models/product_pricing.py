@@ -1,11 +1,10 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from collections import defaultdict
 import math
 from dateutil.relativedelta import relativedelta
 
-from odoo import api, fields, models, _, _lt
+from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
 from odoo.tools import format_amount, float_compare, float_is_zero
 
@@ -26,12 +25,12 @@ class ProductPricing(models.Model):
 
     _name = 'product.pricing'
     _description = 'Pricing rule of temporal products'
-    _order = 'product_template_id,price,pricelist_id,recurrence_id'
+    _order = 'product_template_id,pricelist_id,recurrence_id'
 
     name = fields.Char(compute='_compute_name')
     description = fields.Char(compute='_compute_description')
     recurrence_id = fields.Many2one('sale.temporal.recurrence', string='Recurrency', required=True)
-    price = fields.Monetary(string="Price $", compute="_compute_price_field")
+    price = fields.Monetary(string="Price $", compute="_compute_price_field", store=True, index=True)
     price_percent = fields.Float(string="Price %", required=True, default=1.0)
     currency_id = fields.Many2one('res.currency', 'Currency', compute='_compute_currency_id', store=True)
     product_template_id = fields.Many2one('product.template', string="Product Templates", ondelete='cascade',
@@ -41,54 +40,173 @@ class ProductPricing(models.Model):
     pricelist_id = fields.Many2one('product.pricelist', ondelete='cascade')
     company_id = fields.Many2one('res.company', related='pricelist_id.company_id')
 
-    @api.depends('price_percent', 'product_template_id')
+    @api.depends('price_percent', 'product_template_id.list_price')
     def _compute_price_field(self):
         for price in self:
             price.price = (price.price_percent * price.product_template_id.list_price) / 100
 
+    @api.model
+    def _apply_pricing_grid(self, templates, grid, pricelist=None):
+        """ Create or update the pricings of the given templates from a grid of percentages.
+
+        The pricings applying to all the variants of the templates, for the given pricelist
+        and the recurrences of the grid, are updated, the missing ones are created, all in a
+        single query whatever the number of templates.
+
+        :param product.template templates: templates to price
+        :param dict grid: percentage of the list price, by recurrence id
+        :param product.pricelist pricelist: pricelist of the pricings, if any
+        :return: the created and updated pricings
+        :rtype: product.pricing
+        """
+        if not templates or not grid:
+            return self.browse()
+        pricelist = pricelist or self.env['product.pricelist']
+        currency = pricelist.currency_id or self.env.company.currency_id
+        self.flush_model()
+        templates.flush_recordset(['list_price'])
+        variants_field = self._fields['product_variant_ids']
+        self.env.cr.execute(f"""
+            WITH grid AS (
+                SELECT UNNEST(%(recurrence_ids)s::integer[]) AS recurrence_id,
+                       UNNEST(%(price_percents)s::float8[]) AS price_percent
+            ), pricing AS (
+                SELECT existing.id,
+                       template.id AS product_template_id,
+                       grid.recurrence_id,
+                       grid.price_percent,
+                       ROUND(grid.price_percent::numeric * template.list_price / 100 / %(rounding)s)
+                           * %(rounding)s AS price
+                  FROM product_template template
+            CROSS JOIN grid
+             LEFT JOIN product_pricing existing
+                    ON existing.product_template_id = template.id
+                   AND existing.recurrence_id = grid.recurrence_id
+                   AND existing.pricelist_id IS NOT DISTINCT FROM %(pricelist_id)s
+                   AND NOT EXISTS (
+                        SELECT 1
+                          FROM {variants_field.relation} rel
+                         WHERE rel.{variants_field.column1} = existing.id
+                   )
+                 WHERE template.id IN %(template_ids)s
+            ), updated AS (
+                UPDATE product_pricing
+                   SET price_percent = pricing.price_percent,
+                       price = pricing.price,
+                       write_uid = %(uid)s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                  FROM pricing
+                 WHERE product_pricing.id = pricing.id
+             RETURNING product_pricing.id
+            ), inserted AS (
+                INSERT INTO product_pricing (
+                    product_template_id, recurrence_id, pricelist_id, currency_id, price_percent, price,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT pricing.product_template_id, pricing.recurrence_id, %(pricelist_id)s, %(currency_id)s,
+                       pricing.price_percent, pricing.price,
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM pricing
+                 WHERE pricing.id IS NULL
+             RETURNING id
+            )
+            SELECT id FROM updated
+             UNION ALL
+            SELECT id FROM inserted
+        """, {
+            'recurrence_ids': list(grid),
+            'price_percents': list(grid.values()),
+            'rounding': currency.rounding,
+            'pricelist_id': pricelist.id or None,
+            'currency_id': currency.id,
+            'template_ids': tuple(templates.ids),
+            'uid': self.env.uid,
+        })
+        pricings = self.browse([row[0] for row in self.env.cr.fetchall()])
+        self.invalidate_model()
+        templates.invalidate_recordset(['product_pricing_ids'])
+        pricings.modified(['product_template_id', 'recurrence_id', 'pricelist_id', 'price'])
+        # the price and the currency are written by the query: only their dependents are recomputed
+        for fname in ('price', 'currency_id'):
+            self.env.remove_to_compute(self._fields[fname], pricings)
+        pricings._check_unique_parameters()
+        return pricings
+
     @api.constrains('product_template_id', 'pricelist_id', 'recurrence_id', 'product_variant_ids')
     def _check_unique_parameters(self):
         """ We want to avoid having several lines that applies for the same conditions.
         The pricing must differ by at least one parameter among
         the template, the variants, the pricelist (if defined or not), the duration and the time unit.
+
+        The pricings of all the templates of the batch are checked at once: each pricing gives
+        one key per variant it applies to (a single one when it applies to all the variants).
         """
-        conflict_counter = defaultdict(int)
-        for price in self.product_template_id.product_pricing_ids:
-            key_list = [
-                price.product_template_id.id,
-                price.pricelist_id,
-                price.recurrence_id,
-            ]
-            variants = price.product_variant_ids.ids or [_('all variants')]
-            pricing_has_all_variants = price.product_template_id.product_variant_count == len(price.product_variant_ids)
-            variants = [_('all variants')] if pricing_has_all_variants else variants
-            for v in variants:
-                key_list.append(v)
-                key_val = tuple(key_list)
-                conflict_counter[key_val] += 1
-        pricing_issues = [k for k, v in conflict_counter.items() if v > 1]
-        if pricing_issues:
+        templates = self.product_template_id
+        if not templates:
+            return
+        self.flush_model(['product_template_id', 'pricelist_id', 'recurrence_id', 'product_variant_ids'])
+        self.env['product.product'].flush_model(['product_tmpl_id', 'active'])
+        variants_field = self._fields['product_variant_ids']
+        self.env.cr.execute(f"""
+            WITH pricing AS (
+                SELECT pricing.id,
+                       pricing.product_template_id,
+                       pricing.pricelist_id,
+                       pricing.recurrence_id,
+                       ARRAY_REMOVE(ARRAY_AGG(rel.{variants_field.column2}), NULL) AS variant_ids
+                  FROM product_pricing pricing
+             LEFT JOIN {variants_field.relation} rel ON rel.{variants_field.column1} = pricing.id
+                 WHERE pricing.product_template_id IN %s
+              GROUP BY pricing.id
+            ), variant_count AS (
+                SELECT product_tmpl_id, COUNT(*) AS count
+                  FROM product_product
+                 WHERE active AND product_tmpl_id IN %s
+              GROUP BY product_tmpl_id
+            ), pricing_key AS (
+                SELECT pricing.product_template_id,
+                       pricing.pricelist_id,
+                       pricing.recurrence_id,
+                       UNNEST(CASE
+                           WHEN CARDINALITY(pricing.variant_ids) IN (0, variant_count.count)
+                           THEN ARRAY[NULL]::integer[]
+                           ELSE pricing.variant_ids
+                       END) AS variant_id
+                  FROM pricing
+             LEFT JOIN variant_count ON variant_count.product_tmpl_id = pricing.product_template_id
+            )
+            SELECT 1
+              FROM pricing_key
+          GROUP BY product_template_id, pricelist_id, recurrence_id, variant_id
+            HAVING COUNT(*) > 1
+             LIMIT 1
+        """, [tuple(templates.ids), tuple(templates.ids)])
+        if self.env.cr.rowcount:
             raise ValidationError(_("You cannot have multiple pricing for the same variant, recurrence and pricelist"))
 
     @api.depends_context('lang')
     @api.depends('recurrence_id')
     def _compute_name(self):
+        name_format = _("%s %s")
         for pricing in self:
             # TODO in master: use pricing.recurrence_id.duration_display
-            pricing.name = _(
-                "%s %s",
+            pricing.name = name_format % (
                 pricing.recurrence_id.duration,
                 pricing._get_unit_label(pricing.recurrence_id.duration))
 
+    @api.depends('price', 'currency_id', 'recurrence_id.unit')
     def _compute_description(self):
+        # formatted in the language of the reader, once per amount and per unit of the batch
+        amounts = {}
+        units = {}
         for pricing in self:
-            description = ""
-            if pricing.currency_id.position == 'before':
-                description += format_amount(self.env, amount=pricing.price, currency=pricing.currency_id)
-            else:
-                description += format_amount(self.env, amount=pricing.price, currency=pricing.currency_id)
-            description += _("/%s", pricing.recurrence_id.unit)
-            pricing.description = description
+            key = (pricing.price, pricing.currency_id)
+            if key not in amounts:
+                amounts[key] = format_amount(self.env, amount=pricing.price, currency=pricing.currency_id)
+            unit = pricing.recurrence_id.unit
+            if unit not in units:
+                units[unit] = _("/%s", unit)
+            pricing.description = amounts[key] + units[unit]
 
     @api.depends('pricelist_id', 'pricelist_id.currency_id')
     def _compute_currency_id(self):
@@ -108,7 +226,7 @@ class ProductPricing(models.Model):
         if duration <= 0 or self.recurrence_id.duration <= 0:
             return self.price
         if unit != self.recurrence_id.unit:
-            converted_duration = math.ceil((duration * PERIOD_RATIO[unit]) / (self.recurrence_id.duration * PERIOD_RATIO[self.recurrence_id.unit]))
+            converted_duration = math.ceil((duration * PERIOD_RATIO[unit]) / self.recurrence_id.duration_hours)
         else:
             converted_duration = math.ceil(duration / self.recurrence_id.duration)
         return self.price * converted_duration
@@ -186,17 +304,8 @@ class ProductPricing(models.Model):
         # TODO in master: remove in favor of env['sale.temporal.recurrence']_get_unit_label
         if duration is None:
             return ""
+        labels = self.env['sale.temporal.recurrence']._get_unit_labels()[self.recurrence_id.unit]
         if float_compare(duration, 1.0, precision_digits=2) < 1\
            and not float_is_zero(duration, precision_digits=2):
-            singular_labels = {
-                'hour': _lt("Hour"),
-                'day': _lt("Day"),
-                'week': _lt("Week"),
-                'month': _lt("Month"),
-                'year': _lt("Year"),
-            }
-            if self.recurrence_id.unit in singular_labels:
-                return singular_labels[self.recurrence_id.unit]
-        return dict(
-            self.env['sale.temporal.recurrence']._fields['unit']._description_selection(self.env)
-        )[self.recurrence_id.unit]
+            return labels['singular']
+        return labels['plural']
@@ -9,7 +9,8 @@ class ProductTemplate(models.Model):
     _inherit = 'product.template'
 
     product_pricing_ids = fields.One2many('product.pricing', 'product_template_id', string="Custom Pricings", auto_join=True, copy=True)
-    is_temporal = fields.Boolean(compute='_compute_is_temporal')
+    is_temporal = fields.Boolean(compute='_compute_is_temporal', store=True)
+    # not stored: formatted in the language and with the currency format of the reader
     display_price = fields.Char("Leasing price", help="First leasing pricing of the product", compute="_compute_display_price")
 
     @api.model
@@ -35,13 +36,21 @@ class ProductTemplate(models.Model):
     def _compute_is_temporal(self):
         self.is_temporal = False
 
+    @api.depends(
+        'is_temporal', 'list_price', 'currency_id', 'product_pricing_ids',
+        'product_pricing_ids.price', 'product_pricing_ids.currency_id', 'product_pricing_ids.recurrence_id.unit')
     def _compute_display_price(self):
         temporal_products = self.filtered('is_temporal')
         temporal_priced_products = temporal_products.filtered('product_pricing_ids')
         (self - temporal_products).display_price = ""
+        # No temporal pricing defined, fallback on list price
         for product in (temporal_products - temporal_priced_products):
             product.display_price = _("%(amount)s (fixed)", amount=format_amount(self.env, product.list_price, product.currency_id))
-        # No temporal pricing defined, fallback on list price
+        # the first pricings of all the products are read and described at once
+        first_pricings = self.env['product.pricing'].concat(*(
+            product.product_pricing_ids[:1] for product in temporal_priced_products
+        ))
+        first_pricings.mapped('description')
         for product in temporal_priced_products:
             product.display_price = product.product_pricing_ids[0].description
 
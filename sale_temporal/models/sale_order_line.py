@@ -37,6 +37,32 @@ class SaleOrderLine(models.Model):
         super(SaleOrderLine, self - temporal_lines)._compute_pricelist_item_id()
         temporal_lines.pricelist_item_id = False
 
+    def _compute_price_unit(self):
+        """Price the temporal lines in batch.
+
+        Resolving the best pricing rule is costly, the lines sharing the same pricing
+        parameters (see `_get_price_unit_key`) are thus only priced once.
+        """
+        temporal_lines = self.filtered(
+            lambda line: line.temporal_type and line.qty_invoiced <= 0
+            and line.product_id and line.product_uom and line.order_id.pricelist_id)
+        super(SaleOrderLine, self - temporal_lines)._compute_price_unit()
+        prices = {}
+        for line in temporal_lines:
+            line = line.with_company(line.company_id)
+            key = line._get_price_unit_key()
+            if key not in prices:
+                prices[key] = line.product_id._get_tax_included_unit_price(
+                    line.company_id,
+                    line.order_id.currency_id,
+                    line.order_id.date_order,
+                    'sale',
+                    fiscal_position=line.order_id.fiscal_position_id,
+                    product_price_unit=line._get_display_price(),
+                    product_currency=line.currency_id,
+                )
+            line.price_unit = prices[key]
+
     @api.depends('temporal_type')
     def _compute_product_updatable(self):
         temporal_lines = self.filtered('temporal_type')
@@ -63,6 +89,23 @@ class SaleOrderLine(models.Model):
             )
         return super()._get_pricelist_price()
 
+    def _get_price_unit_key(self):
+        """ Get the values determining the unit price of a temporal line """
+        self.ensure_one()
+        order = self.order_id
+        return (
+            self.company_id.id,
+            order.pricelist_id.id,
+            order.currency_id.id,
+            order.fiscal_position_id.id,
+            order.date_order,
+            self.product_id.id,
+            self.product_uom.id,
+            self.product_uom_qty,
+            tuple(sorted(self._get_product_price_context().items())),
+            tuple(sorted(self._get_price_computing_kwargs().items())),
+        )
+
     def _get_price_computing_kwargs(self):
         """ Get optional fields which may impact price computing """
         self and self.ensure_one() # len(self) <= 1
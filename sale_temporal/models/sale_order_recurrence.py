@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from odoo import api, fields, models, _, _lt
+from odoo import api, fields, models, tools, _
 from odoo.tools import get_timedelta
-from odoo.tools import float_compare, float_is_zero
+from odoo.tools import float_compare, float_is_zero, frozendict
+
+from odoo.addons.sale_temporal.models.product_pricing import PERIOD_RATIO
 
 
 class SaleOrderRecurrence(models.Model):
@@ -17,6 +19,9 @@ class SaleOrderRecurrence(models.Model):
                               help="Minimum duration before this rule is applied. If set to 0, it represents a fixed temporal price.")
     unit = fields.Selection([('day', 'Days'), ("week", "Weeks"), ("month", "Months"), ('year', 'Years')],
         string="Unit", required=True, default='month')
+    duration_hours = fields.Float(
+        compute='_compute_duration_hours', store=True,
+        help="Duration converted in hours, with the approximations of the pricing rules.")
     duration_display = fields.Char(compute='_compute_duration_display')
     subscription_unit_display = fields.Char(compute='_compute_subscription_unit_display')
 
@@ -30,43 +35,78 @@ class SaleOrderRecurrence(models.Model):
             if not record.name:
                 record.name = _("%s %s", record.duration, record.unit)
 
+    @api.depends('duration', 'unit')
+    def _compute_duration_hours(self):
+        for record in self:
+            record.duration_hours = record.duration * PERIOD_RATIO.get(record.unit, 0)
+
     def get_recurrence_timedelta(self):
         self.ensure_one()
-        return get_timedelta(self.duration, self.unit)
+        return self._get_timedelta(self.duration, self.unit)
+
+    @api.model
+    @tools.ormcache('duration', 'unit')
+    def _get_timedelta(self, duration, unit):
+        return get_timedelta(duration, unit)
 
     @api.depends('duration', 'unit')
     def _compute_duration_display(self):
         for record in self:
-            record.duration_display = "%s %s" % (record.duration, self._get_unit_label(record.duration))
+            record.duration_display = "%s %s" % (record.duration, record._get_unit_label(record.duration))
+
+    @api.model
+    @tools.ormcache('self.env.lang')
+    def _get_unit_labels(self):
+        """ Get the translated labels of the units, in the language of the environment.
+
+        :return: by unit, the singular and plural labels, and the "per unit" formats for one
+            and several units (the latter taking the duration as parameter)
+        :rtype: frozendict
+        """
+        singular_labels = {
+            'hour': _("Hour"),
+            'day': _("Day"),
+            'week': _("Week"),
+            'month': _("Month"),
+            'year': _("Year"),
+        }
+        per_unit_labels = {
+            'hour': (_('per hour'), _('per %s hours')),
+            'day': (_('per day'), _('per %s days')),
+            'week': (_('per week'), _('per %s weeks')),
+            'month': (_('per month'), _('per %s months')),
+            'year': (_('per year'), _('per %s years')),
+        }
+        labels = {}
+        for unit, plural_label in self._fields['unit']._description_selection(self.env):
+            per_one, per_many = per_unit_labels.get(unit, ("", ""))
+            labels[unit] = frozendict(
+                singular=singular_labels.get(unit, plural_label),
+                plural=plural_label,
+                per_one=per_one,
+                per_many=per_many,
+            )
+        return frozendict(labels)
 
     def _get_unit_label(self, duration):
         """ Get the translated product pricing unit label. """
         if duration is None:
             return ""
         self.ensure_one()
+        labels = self._get_unit_labels()[self.unit]
         if float_compare(duration, 1.0, precision_digits=2) < 1\
            and not float_is_zero(duration, precision_digits=2):
-            singular_labels = {
-                'hour': _lt("Hour"),
-                'day': _lt("Day"),
-                'week': _lt("Week"),
-                'month': _lt("Month"),
-                'year': _lt("Year"),
-            }
-            if self.unit in singular_labels:
-                return str(singular_labels[self.unit]).lower()
-        return dict(
-            self._fields['unit']._description_selection(self.env)
-        )[self.unit].lower()
+            return labels['singular'].lower()
+        return labels['plural'].lower()
 
     @api.depends('duration', 'unit')
     def _compute_subscription_unit_display(self):
+        unit_labels = self._get_unit_labels()
         for order in self:
-            if order.unit == 'day':
-                order.subscription_unit_display = _('per %s days', order.duration) if order.duration > 1 else _('per day')
-            elif order.unit == 'week':
-                order.subscription_unit_display = _('per %s weeks', order.duration) if order.duration > 1 else _('per week')
-            elif order.unit == 'month':
-                order.subscription_unit_display = _('per %s months', order.duration) if order.duration > 1 else _('per month')
-            elif order.unit == 'year':
-                order.subscription_unit_display = _('per %s years', order.duration) if order.duration > 1 else _('per year')
+            labels = unit_labels.get(order.unit)
+            if not labels:
+                order.subscription_unit_display = False
+            elif order.duration > 1:
+                order.subscription_unit_display = labels['per_many'] % order.duration
+            else:
+                order.subscription_unit_display = labels['per_one']